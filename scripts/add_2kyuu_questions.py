@@ -5,30 +5,9 @@
 2級レベルの高難度問題を46問追加
 """
 
-import json
-from pathlib import Path
-from typing import List, Dict, Any
-
-def load_existing_questions() -> List[Dict]:
-    """既存の問題を読み込む"""
-    json_path = Path(__file__).parent.parent / "public" / "data" / "questions.json"
-    if json_path.exists():
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get('questions', [])
-    return []
-
-def get_next_id(existing_questions: List[Dict]) -> str:
-    """次のIDを取得"""
-    max_id = 0
-    for q in existing_questions:
-        if q['id'].startswith('q'):
-            try:
-                id_num = int(q['id'][1:])
-                max_id = max(max_id, id_num)
-            except:
-                continue
-    return f"q{max_id + 1:03d}"
+from question_bank import QuestionBank
+from question_io import QUESTIONS_JSON_PATH, append_questions, write_questions
+from similar_questions import SimilarityIndex, warn_similar
 
 def create_2kyuu_questions():
     """2級レベルの問題を作成"""
@@ -515,21 +494,26 @@ def create_2kyuu_questions():
 
 def main():
     """メイン処理"""
-    existing_questions = load_existing_questions()
-    print(f"既存問題数: {len(existing_questions)}")
+    bank = QuestionBank.load()
+    print(f"既存問題数: {len(bank)}")
     
     # 現在の2級問題数を確認
-    current_2kyuu_2004 = len([q for q in existing_questions 
-                              if q['level'] == '2級' and q['exam-year'] == '2004/12/12'])
+    current_2kyuu_2004 = bank.count('2級', '2004/12/12')
     print(f"現在の2級 2004/12/12 問題数: {current_2kyuu_2004}")
     print(f"不足問題数: {100 - current_2kyuu_2004}問")
     
     # 2級問題を作成
     new_questions = create_2kyuu_questions()
     
-    # IDを付与
-    for i, q in enumerate(new_questions):
-        q["id"] = get_next_id(existing_questions + new_questions[:i])
+    # 既存問題（と先に追加した問題）との類似を確認してからIDを付与
+    index = SimilarityIndex(bank.questions)
+    similar_count = 0
+    for q in new_questions:
+        print(f"\n📝 {q['category']}: {q['question'][:50]}")
+        similar_count += warn_similar(index, q) > 0
+        index.add(q)
+        bank.add(q)
+    print(f"\n類似問題のある追加問題: {similar_count}問")
     
     # 統計表示
     print(f"\n追加する2級問題数: {len(new_questions)}")
@@ -545,39 +529,27 @@ def main():
     
     # ファイルに保存
     output_file = "additional_2kyuu_questions.json"
-    output_data = {"questions": new_questions}
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    write_questions(new_questions, output_file)
     
     print(f"\n{output_file} に保存しました")
     
     # questions.jsonにマージするか確認
     merge = input(f"\n既存のquestions.jsonに{len(new_questions)}問を追加しますか？ (y/n): ").strip().lower()
     if merge == 'y':
-        all_questions = existing_questions + new_questions
-        
-        json_path = Path(__file__).parent.parent / "public" / "data" / "questions.json"
-        merged_data = {"questions": all_questions}
+        all_questions = bank.questions
         
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(merged_data, f, ensure_ascii=False, indent=2)
+        # 既存の問題は書き直さず、配列の末尾に追記する
+        append_questions(new_questions, QUESTIONS_JSON_PATH)
         
         print(f"\nquestions.jsonを更新しました")
         print(f"総問題数: {len(all_questions)}問 (新規追加: {len(new_questions)}問)")
         
         # 更新後の統計
-        level_stats = {}
-        for q in all_questions:
-            level_key = q["level"] + "_" + q["exam-year"]
-            level_stats[level_key] = level_stats.get(level_key, 0) + 1
-        
         print("\n更新後の統計:")
-        for key, count in sorted(level_stats.items()):
-            level, year = key.split('_', 1)
+        for (level, year), count in sorted(bank.level_year_counts.items()):
             print(f"  {level} {year}: {count}問")
         
-        print(f"\n🎉 完了！2級 2004/12/12 が {level_stats.get('2級_2004/12/12', 0)}問になりました！")
+        print(f"\n🎉 完了！2級 2004/12/12 が {bank.count('2級', '2004/12/12')}問になりました！")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,36 +5,15 @@
 PDFの完全自動抽出が困難なため、手動で重要問題を追加
 """
 
-import json
-from pathlib import Path
-from typing import List, Dict, Any
-
-def load_existing_questions() -> List[Dict]:
-    """既存の問題を読み込む"""
-    json_path = Path(__file__).parent.parent / "public" / "data" / "questions.json"
-    if json_path.exists():
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get('questions', [])
-    return []
-
-def get_next_id(existing_questions: List[Dict]) -> str:
-    """次のIDを取得"""
-    max_id = 0
-    for q in existing_questions:
-        if q['id'].startswith('q'):
-            try:
-                id_num = int(q['id'][1:])
-                max_id = max(max_id, id_num)
-            except:
-                continue
-    return f"q{max_id + 1:03d}"
+from question_bank import QuestionBank
+from question_io import QUESTIONS_JSON_PATH, append_questions, write_questions
+from similar_questions import SimilarityIndex, warn_similar
 
 def add_sample_missing_questions():
     """サンプルとして不足問題を手動で追加"""
     
-    existing_questions = load_existing_questions()
-    print(f"既存問題数: {len(existing_questions)}")
+    bank = QuestionBank.load()
+    print(f"既存問題数: {len(bank)}")
     
     # 不足している3級問題のサンプル（京都検定の典型的な問題）
     missing_3kyuu_questions = [
@@ -184,11 +163,16 @@ def add_sample_missing_questions():
         }
     ]
     
-    # IDを付与
+    # 既存問題（と先に追加した問題）との類似を確認してからIDを付与
+    index = SimilarityIndex(bank.questions)
     new_questions = []
-    for i, q in enumerate(missing_3kyuu_questions):
-        q["id"] = get_next_id(existing_questions + new_questions)
-        new_questions.append(q)
+    similar_count = 0
+    for q in missing_3kyuu_questions:
+        print(f"\n📝 {q['category']}: {q['question'][:50]}")
+        similar_count += warn_similar(index, q) > 0
+        index.add(q)
+        new_questions.append(bank.add(q))
+    print(f"\n類似問題のある追加問題: {similar_count}問")
     
     # 統計表示
     print(f"\n追加する3級問題数: {len(new_questions)}")
@@ -204,37 +188,24 @@ def add_sample_missing_questions():
     
     # ファイルに保存
     output_file = "additional_3kyuu_questions.json"
-    output_data = {"questions": new_questions}
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    write_questions(new_questions, output_file)
     
     print(f"\n{output_file} に保存しました")
     
     # questions.jsonにマージするか確認
     merge = input(f"\n既存のquestions.jsonに{len(new_questions)}問を追加しますか？ (y/n): ").strip().lower()
     if merge == 'y':
-        all_questions = existing_questions + new_questions
+        all_questions = bank.questions
         
-        json_path = Path(__file__).parent.parent / "public" / "data" / "questions.json"
-        merged_data = {"questions": all_questions}
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(merged_data, f, ensure_ascii=False, indent=2)
+        # 既存の問題は書き直さず、配列の末尾に追記する
+        append_questions(new_questions, QUESTIONS_JSON_PATH)
         
         print(f"\nquestions.jsonを更新しました")
         print(f"総問題数: {len(all_questions)}問 (新規追加: {len(new_questions)}問)")
         
         # 更新後の統計
-        level_stats = {}
-        year_stats = {}
-        for q in all_questions:
-            level_key = q["level"] + "_" + q["exam-year"]
-            level_stats[level_key] = level_stats.get(level_key, 0) + 1
-        
         print("\n更新後の統計:")
-        for key, count in sorted(level_stats.items()):
-            level, year = key.split('_', 1)
+        for (level, year), count in sorted(bank.level_year_counts.items()):
             print(f"  {level} {year}: {count}問")
 
 if __name__ == "__main__":
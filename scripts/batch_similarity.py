@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行列演算による類似度の一括推定
+バケット内の問題文n-gram・キーワード・選択肢を疎行列（scipy がなければ
+NumPy の密行列）にし、0.5/0.3/0.2 の重み付きスコアをまとめて推定する。
+推定値が閾値付近以上の組み合わせだけを calculate_similarity で再計算する前提
+"""
+
+from typing import Dict, Iterator, List, Set, Tuple
+
+from candidate_index import char_ngrams
+
+try:
+    import numpy as np
+except ImportError:  # NumPy がない環境では候補絞り込みインデックスを使う
+    np = None
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+HAS_NUMPY = np is not None
+# 一度に推定する query の行数（query × target の行列をこの行数ずつ作る）
+BLOCK_ROWS = 256
+
+
+def _incidence(sets: List[Set[str]], vocabulary: Dict[str, int]):
+    """集合のリストから 0/1 の出現行列を作成"""
+    rows, cols = [], []
+    for row, values in enumerate(sets):
+        for value in values:
+            col = vocabulary.get(value)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    shape = (len(sets), max(len(vocabulary), 1))
+    if sparse is not None:
+        data = np.ones(len(rows), dtype=np.float32)
+        return sparse.csr_matrix((data, (rows, cols)), shape=shape)
+    matrix = np.zeros(shape, dtype=np.float32)
+    matrix[rows, cols] = 1.0
+    return matrix
+
+
+def _prepare(query_sets: List[Set[str]], target_sets: List[Set[str]]) -> Tuple:
+    """query と target の出現行列（target は転置済み）と、それぞれの要素数を返す"""
+    vocabulary = {}
+    for values in target_sets:
+        for value in values:
+            vocabulary.setdefault(value, len(vocabulary))
+    target_matrix = _incidence(target_sets, vocabulary).T
+    if sparse is not None:
+        target_matrix = target_matrix.tocsr()
+    query_sizes = np.array([len(values) for values in query_sets], dtype=np.float32)
+    target_sizes = np.array([len(values) for values in target_sets], dtype=np.float32)
+    return _incidence(query_sets, vocabulary), target_matrix, query_sizes, target_sizes
+
+
+def _ratio(numerator, denominator):
+    """0 除算を 0.0 として割り算"""
+    return np.divide(numerator, denominator,
+                     out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def _block_similarity(prepared: Tuple, start: int, end: int, dice: bool):
+    """query の start〜end 行目について、Dice 係数（dice=False なら Jaccard 係数）の行列を返す
+
+    scipy があれば共通要素がある組み合わせだけを持つ疎行列のまま計算する
+    """
+    query_matrix, target_matrix, query_sizes, target_sizes = prepared
+    common = query_matrix[start:end] @ target_matrix
+    query_sizes = query_sizes[start:end]
+    if sparse is not None and sparse.issparse(common):
+        common = common.tocoo()
+        total = query_sizes[common.row] + target_sizes[common.col]
+        values = 2 * common.data / total if dice else common.data / (total - common.data)
+        return sparse.csr_matrix((values, (common.row, common.col)), shape=common.shape)
+    common = np.asarray(common)
+    total = query_sizes[:, None] + target_sizes[None, :]
+    return _ratio(2 * common, total) if dice else _ratio(common, total - common)
+
+
+def estimate_score_blocks(query_features: List[Dict], target_features: List[Dict],
+                          ngram_size: int = 2,
+                          block_rows: int = BLOCK_ROWS) -> Iterator[Tuple[int, object]]:
+    """重み付き類似度を行列で推定し、query の block_rows 行ごとに (先頭の行, 行列) を返す
+
+    行列は行: query, 列: target で、scipy があれば推定値が 0 でない組み合わせだけを持つ疎行列。
+    query × target 全体の密行列は作らない。
+    問題文類似度は SequenceMatcher の代わりに n-gram の Dice 係数で近似し、
+    キーワードと選択肢の Jaccard 係数は calculate_similarity と同じ値になる
+    """
+    texts = _prepare([char_ngrams(f['text'], ngram_size) for f in query_features],
+                     [char_ngrams(f['text'], ngram_size) for f in target_features])
+    terms = _prepare([f['terms'] for f in query_features], [f['terms'] for f in target_features])
+    options = _prepare([f['options'] for f in query_features], [f['options'] for f in target_features])
+    for start in range(0, len(query_features), block_rows):
+        end = min(start + block_rows, len(query_features))
+        yield start, (
+            _block_similarity(texts, start, end, dice=True) * 0.5 +
+            _block_similarity(terms, start, end, dice=False) * 0.3 +
+            _block_similarity(options, start, end, dice=False) * 0.2
+        )
+
+
+def batch_candidates(query_features: List[Dict], target_features: List[Dict],
+                     min_score: float = 0.2) -> List[List[int]]:
+    """推定スコアが min_score 以上の target の添字を query ごとに返す
+
+    min_score は報告閾値 0.4 より低めに取り、推定誤差で取りこぼさないようにする
+    （0 より大きい前提で、疎行列に持たない組み合わせは候補にしない）
+    """
+    if not query_features or not target_features:
+        return [[] for _ in query_features]
+    result = []
+    for _, scores in estimate_score_blocks(query_features, target_features):
+        if sparse is not None and sparse.issparse(scores):
+            scores = scores.tocsr()
+            for row in range(scores.shape[0]):
+                lo, hi = scores.indptr[row], scores.indptr[row + 1]
+                columns = scores.indices[lo:hi][scores.data[lo:hi] >= min_score]
+                result.append(np.sort(columns).tolist())
+        else:
+            result.extend(np.nonzero(row >= min_score)[0].tolist() for row in scores)
+    return result
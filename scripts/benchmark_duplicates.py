@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重複チェックのベンチマークスクリプト
+questions.json の問題文・選択肢を組み替えて 3千・3万・30万問規模の問題集を作成し、
+normalize_text / extract_key_terms / calculate_similarity と重複チェック全体の
+実行時間・1秒あたりの処理件数・ピークメモリを計測する。
+結果はベースラインと比較し、遅くなった項目を表示する
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from check_duplicates import calculate_similarity, detect_duplicates, extract_key_terms, group_by_bucket
+from question_bank import format_question_id
+from question_io import QUESTIONS_JSON_PATH, iter_questions, write_bytes_atomic
+from text_normalize import normalize_text
+
+DEFAULT_SIZES = [3000, 30000, 300000]
+BASELINE_PATH = Path(__file__).parent / "benchmarks" / "duplicate_checker_baseline.json"
+BASELINE_VERSION = 1
+SENTENCE_BREAKS = ('、', '，', 'は', 'の', 'を')
+
+
+def splice_point(text: str, rng: random.Random) -> int:
+    """問題文を組み替える位置（読点や助詞の直後、なければ中央付近）"""
+    points = [i + 1 for i, char in enumerate(text) if char in SENTENCE_BREAKS and 0 < i < len(text) - 1]
+    return rng.choice(points) if points else len(text) // 2
+
+
+def resample_corpus(questions: List[Dict], size: int, seed: int = 0) -> List[Dict]:
+    """実際の問題から size 問の問題集を作成
+
+    級・カテゴリ・試験日の分布は元の問題に合わせ、問題文は同じ（級, カテゴリ）の
+    2問の前半と後半をつなぎ、選択肢は同じ（級, カテゴリ）の選択肢から選ぶ
+    """
+    rng = random.Random(seed)
+    buckets = {key: [questions[pos] for pos in positions]
+               for key, positions in group_by_bucket(questions).items()}
+    option_pools = {key: sorted({opt for q in members for opt in q['options']})
+                    for key, members in buckets.items()}
+    corpus = []
+    for number in range(1, size + 1):
+        base = rng.choice(questions)
+        key = (base['level'], base['category'])
+        donor = rng.choice(buckets[key])
+        head = base['question'][:splice_point(base['question'], rng)]
+        tail = donor['question'][splice_point(donor['question'], rng):]
+        pool = option_pools[key]
+        options = rng.sample(pool, 4) if len(pool) >= 4 else list(base['options'])
+        corpus.append({
+            'id': format_question_id(number),
+            'level': base['level'],
+            'category': base['category'],
+            'exam-year': base['exam-year'],
+            'question': head + tail,
+            'options': options,
+            'correctAnswer': rng.randrange(4),
+        })
+    return corpus
+
+
+def sample_bucket_pairs(questions: List[Dict], count: int, seed: int = 0) -> List[Tuple[Dict, Dict]]:
+    """同じ（級, カテゴリ）の問題の組み合わせを count 組選ぶ"""
+    rng = random.Random(seed)
+    buckets = [positions for positions in group_by_bucket(questions).values() if len(positions) >= 2]
+    weights = [len(positions) for positions in buckets]
+    pairs = []
+    for positions in rng.choices(buckets, weights=weights, k=count):
+        pos1, pos2 = rng.sample(positions, 2)
+        pairs.append((questions[pos1], questions[pos2]))
+    return pairs
+
+
+def bucket_pair_count(existing_questions: List[Dict], new_questions: List[Dict]) -> int:
+    """重複チェックが対象とする組み合わせの数（新規×既存 + 新規どうし、同じ級・カテゴリのみ）"""
+    existing_sizes = {key: len(positions) for key, positions in group_by_bucket(existing_questions).items()}
+    total = 0
+    for key, positions in group_by_bucket(new_questions).items():
+        total += len(positions) * existing_sizes.get(key, 0)
+        total += len(positions) * (len(positions) - 1) // 2
+    return total
+
+
+def measure(func: Callable[[], None], items: int, memory: bool) -> Dict:
+    """func の実行時間と1秒あたりの処理件数、ピークメモリを計測
+
+    計測の影響を避けるため、ピークメモリは tracemalloc を有効にした2回目の実行で測る
+    """
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    result = {
+        'seconds': round(seconds, 4),
+        'items': items,
+        'items_per_second': round(items / seconds, 1) if seconds > 0 else None,
+        'peak_mb': None,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(questions: List[Dict], sizes: List[int], similarity_pairs: int = 20000,
+                   new_ratio: float = 0.1, end_to_end_limit: Optional[int] = None,
+                   engine: str = 'index', memory: bool = True, seed: int = 0) -> Dict[str, Dict]:
+    """規模ごとにベンチマークを実行し、'<項目>@<問題数>' → 計測結果 を返す"""
+    results = {}
+    for size in sizes:
+        print(f"\n=== {size:,}問 ===")
+        corpus = resample_corpus(questions, size, seed)
+        texts = [q['question'] for q in corpus]
+        option_texts = [opt for q in corpus for opt in q['options']]
+        pairs = sample_bucket_pairs(corpus, similarity_pairs, seed)
+
+        cases = [
+            ('normalize_text', len(texts) + len(option_texts),
+             lambda: [normalize_text(text) for text in texts + option_texts]),
+            ('extract_key_terms', len(texts),
+             lambda: [extract_key_terms(text) for text in texts]),
+            ('calculate_similarity', len(pairs),
+             lambda: [calculate_similarity(q1, q2) for q1, q2 in pairs]),
+        ]
+        if end_to_end_limit is None or size <= end_to_end_limit:
+            split = size - max(1, int(size * new_ratio))
+            existing, new = corpus[:split], corpus[split:]
+            cases.append(('end_to_end', bucket_pair_count(existing, new),
+                          lambda: detect_duplicates(existing, new, engine=engine)))
+
+        for name, items, func in cases:
+            result = measure(func, items, memory)
+            results[f"{name}@{size}"] = result
+            peak = f"{result['peak_mb']:.1f} MB" if result['peak_mb'] is not None else "-"
+            print(f"  {name:<22} {result['seconds']:>9.3f} 秒  "
+                  f"{result['items_per_second'] or 0:>14,.0f} 件/秒  ピーク {peak}")
+    return results
+
+
+def compare_with_baseline(results: Dict[str, Dict], baseline: Dict[str, Dict],
+                          tolerance: float) -> List[str]:
+    """ベースラインより tolerance を超えて遅くなった項目を列挙"""
+    regressions = []
+    print("\n=== ベースラインとの比較（処理件数/秒） ===")
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous or not previous.get('items_per_second') or not result['items_per_second']:
+            continue
+        ratio = result['items_per_second'] / previous['items_per_second']
+        mark = "✅"
+        if ratio < 1 - tolerance:
+            mark = "⚠️"
+            regressions.append(key)
+        print(f"  {mark} {key:<32} {ratio:>6.2f} 倍")
+    return regressions
+
+
+def load_baseline(path: Path) -> Dict[str, Dict]:
+    """ベースラインを読み込む（ファイルがなければ空）"""
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != BASELINE_VERSION:
+        return {}
+    return data.get('results', {})
+
+
+def save_report(results: Dict[str, Dict], path: Path):
+    """計測結果を実行環境とともに保存"""
+    report = {
+        'version': BASELINE_VERSION,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_bytes_atomic(path, json.dumps(report, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="重複チェックの処理速度とメモリ使用量を計測")
+    parser.add_argument('--input', type=Path, default=QUESTIONS_JSON_PATH, help="組み替えに使う問題ファイル")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="計測する問題数")
+    parser.add_argument('--similarity-pairs', type=int, default=20000,
+                        help="calculate_similarity の計測に使う組み合わせ数")
+    parser.add_argument('--new-ratio', type=float, default=0.1,
+                        help="重複チェック全体の計測で新規問題として扱う割合")
+    parser.add_argument('--end-to-end-limit', type=int,
+                        help="重複チェック全体を計測する最大の問題数（省略時はすべての規模）")
+    parser.add_argument('--engine', choices=['index', 'batch', 'exhaustive'], default='index',
+                        help="重複チェック全体の計測に使う候補の絞り込み方法")
+    parser.add_argument('--no-memory', action='store_true', help="ピークメモリを計測しない")
+    parser.add_argument('--seed', type=int, default=0, help="問題集を作成する乱数の種")
+    parser.add_argument('--output', type=Path, help="計測結果の保存先（JSON）")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help="比較するベースライン")
+    parser.add_argument('--save-baseline', action='store_true', help="計測結果をベースラインとして保存")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="遅くなったとみなす割合（既定: 0.25 = 25%%）")
+    args = parser.parse_args()
+
+    questions = list(iter_questions(args.input, exclude=['explanation']))
+    print(f"元の問題数: {len(questions)}")
+    results = run_benchmarks(questions, args.sizes, similarity_pairs=args.similarity_pairs,
+                             new_ratio=args.new_ratio, end_to_end_limit=args.end_to_end_limit,
+                             engine=args.engine, memory=not args.no_memory, seed=args.seed)
+
+    if args.output:
+        save_report(results, args.output)
+        print(f"\n計測結果を {args.output} に保存しました")
+    if args.save_baseline:
+        save_report(results, args.baseline)
+        print(f"\nベースラインを {args.baseline} に保存しました")
+        return
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"\nベースラインがありません（--save-baseline で {args.baseline} に保存できます）")
+        return
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n⚠️ 遅くなった項目: {len(regressions)}件")
+        sys.exit(1)
+    print("\n✅ ベースラインからの性能低下はありません")
+
+
+if __name__ == "__main__":
+    main()
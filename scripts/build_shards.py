@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+問題データ分割ビルドスクリプト
+questions.json を級ごと（オプションで試験日ごと）のファイルに分割し、
+件数と内容ハッシュを記録したマニフェストを作成する。
+--split-explanations では解説を問題本体から切り離し、ID順のまとまりで別ファイルにする
+"""
+
+import argparse
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from question_bank import parse_question_id
+from question_io import QUESTIONS_JSON_PATH, dumps_questions, iter_questions, write_bytes_atomic
+
+DEFAULT_OUTPUT_DIR = QUESTIONS_JSON_PATH.parent / "shards"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+EXPLANATION_DIR = "explanations"
+
+# PDFからの抽出時に残った出典マーカー（例: [cite: 111-125, 126]）
+CITATION_MARKER = re.compile(r'\s*\[cite(?:_start|_end)?(?::[^\]]*)?\]')
+
+
+def level_slug(level: str) -> str:
+    """級をファイル名用の文字列に変換（例: 3級 → 3kyuu）"""
+    return level.replace('級', 'kyuu')
+
+
+def exam_year_slug(exam_year: str) -> str:
+    """試験日をファイル名用の文字列に変換（例: 2004/12/12 → 20041212）"""
+    return exam_year.replace('/', '')
+
+
+def shard_key(q: Dict, by_year: bool) -> Tuple[str, Optional[str]]:
+    """問題が属する分割単位（級, 試験日）"""
+    return (q['level'], q['exam-year'] if by_year else None)
+
+
+def shard_file_name(level: str, exam_year: Optional[str]) -> str:
+    """分割ファイルのファイル名"""
+    if exam_year is None:
+        return f"{level_slug(level)}.json"
+    return f"{level_slug(level)}_{exam_year_slug(exam_year)}.json"
+
+
+def content_digest(content: bytes) -> str:
+    """ファイル内容のハッシュ"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def strip_citations(text: str) -> str:
+    """解説から出典マーカーを取り除く"""
+    return CITATION_MARKER.sub('', text)
+
+
+def id_sort_key(question_id: str) -> Tuple[int, str]:
+    """'q123' 形式のIDを番号順に並べるためのキー"""
+    number = parse_question_id(question_id)
+    return (number if number is not None else float('inf'), question_id)
+
+
+def build_explanation_chunks(questions: List[Dict], output_dir: Path, chunk_size: int,
+                             compact: bool) -> List[Dict]:
+    """解説をID順に chunk_size 問ずつまとめて書き出し、マニフェスト用の情報を返す
+
+    各ファイルは {ID: 解説} の辞書。アプリは manifest の first-id / last-id の範囲から
+    必要なファイルだけを読み込める
+    """
+    explanations: Dict[str, str] = {}
+    duplicated = set()
+    for q in questions:
+        if q['id'] in explanations:
+            duplicated.add(q['id'])
+            continue
+        explanations[q['id']] = q.get('explanation', '')
+    if duplicated:
+        print(f"⚠️ IDが重複している問題が{len(duplicated)}件あります（解説は最初の問題のもののみ出力）")
+
+    chunk_dir = output_dir / EXPLANATION_DIR
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    ids = sorted(explanations, key=id_sort_key)
+    chunks = []
+    for start in range(0, len(ids), chunk_size):
+        chunk_ids = ids[start:start + chunk_size]
+        data = {question_id: explanations[question_id] for question_id in chunk_ids}
+        if compact:
+            content = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        else:
+            content = json.dumps(data, ensure_ascii=False, indent=2)
+        content = content.encode('utf-8')
+        file_name = f"{EXPLANATION_DIR}/{chunk_ids[0]}-{chunk_ids[-1]}.json"
+        write_bytes_atomic(output_dir / file_name, content)
+        chunks.append({
+            'file': file_name,
+            'first-id': chunk_ids[0],
+            'last-id': chunk_ids[-1],
+            'count': len(chunk_ids),
+            'bytes': len(content),
+            'sha256': content_digest(content),
+        })
+    return chunks
+
+
+def remove_stale_shards(output_dir: Path, manifest: Dict):
+    """前回のマニフェストにあり今回出力しなかったファイルを削除"""
+    manifest_path = output_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        return
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except ValueError:
+        return
+    current_files = {shard['file'] for shard in manifest['shards'] + manifest.get('explanations', [])}
+    for shard in previous.get('shards', []) + previous.get('explanations', []):
+        stale = output_dir / shard['file']
+        if shard['file'] not in current_files and stale.exists():
+            stale.unlink()
+            print(f"  削除: {shard['file']}")
+    chunk_dir = output_dir / EXPLANATION_DIR
+    if 'explanations' not in manifest and chunk_dir.is_dir() and not any(chunk_dir.iterdir()):
+        chunk_dir.rmdir()
+
+
+def build_shards(source: Path = QUESTIONS_JSON_PATH, output_dir: Path = DEFAULT_OUTPUT_DIR,
+                 by_year: bool = False, compact: bool = True,
+                 split_explanations: bool = False, explanation_chunk_size: int = 200) -> Dict:
+    """分割ファイルとマニフェストを書き出し、マニフェストを返す
+
+    解説の出典マーカーはここで取り除く。split_explanations=True では
+    分割ファイルから解説を除き、解説は別ファイルにまとめる
+    """
+    all_questions = []
+    shards: Dict[Tuple[str, Optional[str]], List[Dict]] = {}
+    for q in iter_questions(source):
+        if 'explanation' in q:
+            q['explanation'] = strip_citations(q['explanation'])
+        all_questions.append(q)
+        if split_explanations:
+            q = {k: v for k, v in q.items() if k != 'explanation'}
+        shards.setdefault(shard_key(q, by_year), []).append(q)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {'version': MANIFEST_VERSION, 'total': 0, 'shards': []}
+    if split_explanations:
+        manifest['explanations'] = build_explanation_chunks(
+            all_questions, output_dir, explanation_chunk_size, compact)
+    for (level, exam_year), questions in sorted(shards.items()):
+        content = dumps_questions(questions, compact).encode('utf-8')
+        file_name = shard_file_name(level, exam_year)
+        write_bytes_atomic(output_dir / file_name, content)
+        manifest['total'] += len(questions)
+        manifest['shards'].append({
+            'level': level,
+            'exam-year': exam_year,
+            'file': file_name,
+            'count': len(questions),
+            'bytes': len(content),
+            'sha256': content_digest(content),
+        })
+
+    remove_stale_shards(output_dir, manifest)
+    manifest_content = json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+    write_bytes_atomic(output_dir / MANIFEST_NAME, manifest_content)
+    return manifest
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="questions.json を級・試験日ごとに分割")
+    parser.add_argument('--input', type=Path, default=QUESTIONS_JSON_PATH, help="読み込むファイル")
+    parser.add_argument('--output-dir', type=Path, default=DEFAULT_OUTPUT_DIR, help="出力先ディレクトリ")
+    parser.add_argument('--by-year', action='store_true', help="級に加えて試験日ごとに分割")
+    parser.add_argument('--pretty', action='store_true', help="最小化せず整形して出力")
+    parser.add_argument('--split-explanations', action='store_true',
+                        help="解説を問題本体から切り離して別ファイルに出力")
+    parser.add_argument('--explanation-chunk-size', type=int, default=200,
+                        help="解説ファイル1つにまとめる問題数")
+    args = parser.parse_args()
+
+    manifest = build_shards(args.input, args.output_dir, by_year=args.by_year, compact=not args.pretty,
+                            split_explanations=args.split_explanations,
+                            explanation_chunk_size=args.explanation_chunk_size)
+
+    print(f"=== 分割完了: {args.output_dir} ===")
+    for shard in manifest['shards']:
+        label = shard['level'] if shard['exam-year'] is None else f"{shard['level']} {shard['exam-year']}"
+        print(f"  {label}: {shard['count']}問 ({shard['bytes']:,} バイト) → {shard['file']}")
+    if 'explanations' in manifest:
+        explanation_bytes = sum(chunk['bytes'] for chunk in manifest['explanations'])
+        print(f"  解説: {len(manifest['explanations'])}ファイル ({explanation_bytes:,} バイト)"
+              f" → {EXPLANATION_DIR}/")
+    print(f"総問題数: {manifest['total']}問")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+問題の一括編集スクリプト
+削除・項目の編集・並べ替えをまとめて検証し、1回の走査と1回の再採番で適用して
+questions.json を1回だけ書き出す。旧ID→新IDの対応表も出力する
+
+操作ファイルの例:
+{
+  "delete": ["q488", "q1024"],
+  "edit": {"q001": {"category": "歴史"}},
+  "move": [{"id": "q010", "after": "q020"}, {"id": "q011", "before": "q001"}],
+  "renumber": "shift"
+}
+
+削除・編集はIDが一致するすべての問題に適用する。
+renumber は次のいずれか:
+  shift      削除したIDより大きいIDを、その下で削除した件数だけ繰り上げる（既定）
+  sequential 並び順に q001 から振り直す
+  none       IDを変更しない
+安定ID（stable_ids.py で移行したID）は shift / none では変更しない。
+移行前の旧IDで指定した操作は、対応表（id_aliases.json）で安定IDに読み替える。
+"""
+
+import argparse
+import json
+import sys
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from question_bank import format_question_id, parse_question_id, validate_question
+from question_io import QUESTIONS_JSON_PATH, iter_questions, write_bytes_atomic, write_questions
+from stable_ids import ALIASES_PATH, load_aliases, resolve_id
+
+RENUMBER_MODES = ('shift', 'sequential', 'none')
+EDITABLE_FIELDS = ('level', 'category', 'exam-year', 'question', 'options', 'correctAnswer', 'explanation')
+
+
+def resolve_operations(operations: Dict, aliases: Dict[str, str]) -> Dict:
+    """操作に含まれる旧IDを対応表で安定IDに読み替えた操作を返す（元の操作は変更しない）"""
+    if not aliases:
+        return operations
+    resolved = dict(operations)
+    if 'delete' in operations:
+        resolved['delete'] = [resolve_id(question_id, aliases) for question_id in operations['delete']]
+    if isinstance(operations.get('edit'), dict):
+        resolved['edit'] = {resolve_id(question_id, aliases): changes
+                            for question_id, changes in operations['edit'].items()}
+    if 'move' in operations:
+        resolved['move'] = [{key: resolve_id(value, aliases) if key in ('id', 'before', 'after') else value
+                             for key, value in move.items()}
+                            for move in operations['move']]
+    return resolved
+
+
+def validate_operations(questions: List[Dict], operations: Dict) -> List[str]:
+    """操作の不備を列挙（1件でもあれば何も適用しない）"""
+    errors = []
+    known_ids = set()
+    duplicated_ids = set()
+    for q in questions:
+        if q['id'] in known_ids:
+            duplicated_ids.add(q['id'])
+        known_ids.add(q['id'])
+    deleted = set(operations.get('delete', []))
+    edits = operations.get('edit', {})
+    moves = operations.get('move', [])
+    moved = {move.get('id') for move in moves}
+    move_counts: Dict[str, int] = {}
+    for move in moves:
+        move_counts[move.get('id')] = move_counts.get(move.get('id'), 0) + 1
+
+    if operations.get('renumber', 'shift') not in RENUMBER_MODES:
+        errors.append(f"renumber は {', '.join(RENUMBER_MODES)} のいずれかです")
+    for question_id in deleted:
+        if question_id not in known_ids:
+            errors.append(f"削除対象 {question_id} が見つかりません")
+    for question_id, changes in edits.items():
+        if not isinstance(changes, dict):
+            errors.append(f"{question_id}: 編集内容は項目名と値の組（オブジェクト）で指定してください")
+            continue
+        if question_id not in known_ids:
+            errors.append(f"編集対象 {question_id} が見つかりません")
+        elif question_id in deleted:
+            errors.append(f"{question_id} は削除と編集の両方に指定されています")
+        invalid_fields = [field for field in changes if field not in EDITABLE_FIELDS]
+        for field in invalid_fields:
+            errors.append(f"{question_id}: {field} は編集できません")
+        if invalid_fields:
+            continue
+        # 編集後の問題がアプリの制約を満たすか（同じIDの問題が複数あればそれぞれ）
+        edited_errors = []
+        for q in questions:
+            if q['id'] == question_id:
+                edited_errors.extend(validate_question({**q, **changes}))
+        for message in dict.fromkeys(edited_errors):
+            errors.append(f"{question_id}: 編集後の {message}")
+    for question_id, count in move_counts.items():
+        if count > 1:
+            errors.append(f"{question_id} は移動に{count}回指定されています")
+    for move in moves:
+        question_id = move.get('id')
+        anchors = [move[key] for key in ('before', 'after') if key in move]
+        if question_id not in known_ids:
+            errors.append(f"移動対象 {question_id} が見つかりません")
+        elif question_id in deleted:
+            errors.append(f"{question_id} は削除と移動の両方に指定されています")
+        if question_id in duplicated_ids:
+            errors.append(f"{question_id} はIDが重複しているため移動できません")
+        if len(anchors) != 1:
+            errors.append(f"{question_id}: before か after のどちらか一方を指定してください")
+            continue
+        anchor = anchors[0]
+        if anchor in duplicated_ids:
+            errors.append(f"{question_id}: 移動先の基準 {anchor} はIDが重複しています")
+        if anchor not in known_ids:
+            errors.append(f"{question_id}: 移動先の基準 {anchor} が見つかりません")
+        elif anchor in deleted or anchor in moved:
+            errors.append(f"{question_id}: 移動先の基準 {anchor} は削除・移動の対象です")
+    return errors
+
+
+def renumber(questions: List[Dict], mode: str, deleted_ids: List[str]) -> Dict[str, str]:
+    """IDを再採番し、変更のあった 旧ID→新ID を返す"""
+    remap = {}
+    if mode == 'none':
+        return remap
+    deleted_numbers = sorted({n for n in map(parse_question_id, deleted_ids) if n is not None})
+    for position, q in enumerate(questions, 1):
+        number = parse_question_id(q['id'])
+        if mode == 'sequential':
+            new_id = format_question_id(position)
+        elif number is not None:
+            new_id = format_question_id(number - bisect_left(deleted_numbers, number))
+        else:
+            continue
+        if new_id != q['id']:
+            remap[q['id']] = new_id
+            q['id'] = new_id
+    return remap
+
+
+def apply_operations(questions: List[Dict], operations: Dict) -> Tuple[List[Dict], Dict[str, Optional[str]]]:
+    """操作を適用した問題一覧と、旧ID→新ID（削除は None）の対応表を返す
+
+    削除・編集・移動の取り出しを1回の走査で行い、移動先への挿入を1回の走査、
+    再採番を1回の走査で行う
+    """
+    errors = validate_operations(questions, operations)
+    if errors:
+        raise ValueError("\n".join(errors))
+
+    deleted = set(operations.get('delete', []))
+    edits = operations.get('edit', {})
+    moves = operations.get('move', [])
+    moved_ids = {move['id'] for move in moves}
+
+    # 削除・編集を適用し、移動する問題を取り出す
+    kept = []
+    moved: Dict[str, Dict] = {}
+    for q in questions:
+        if q['id'] in deleted:
+            continue
+        q = {**q, **edits.get(q['id'], {})}  # 元の一覧は変更しない
+        if q['id'] in moved_ids:
+            moved[q['id']] = q
+        else:
+            kept.append(q)
+
+    # 移動先の基準となる問題の前後に挿入
+    before: Dict[str, List[Dict]] = {}
+    after: Dict[str, List[Dict]] = {}
+    for move in moves:
+        if 'before' in move:
+            before.setdefault(move['before'], []).append(moved[move['id']])
+        else:
+            after.setdefault(move['after'], []).append(moved[move['id']])
+    result = []
+    for q in kept:
+        result.extend(before.pop(q['id'], []))
+        result.append(q)
+        result.extend(after.pop(q['id'], []))
+
+    remap: Dict[str, Optional[str]] = {question_id: None for question_id in sorted(deleted)}
+    remap.update(renumber(result, operations.get('renumber', 'shift'), sorted(deleted)))
+    return result, remap
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="問題の削除・編集・並べ替えを一括で適用")
+    parser.add_argument('operations', type=Path, help="操作を記述したJSONファイル")
+    parser.add_argument('--target', type=Path, default=QUESTIONS_JSON_PATH, help="編集するファイル")
+    parser.add_argument('--remap-out', type=Path, help="旧ID→新IDの対応表の出力先（JSON）")
+    parser.add_argument('--aliases', type=Path, default=ALIASES_PATH,
+                        help="旧ID→安定IDの対応表（stable_ids.py migrate で作成）")
+    parser.add_argument('--dry-run', action='store_true', help="検証と結果の表示のみ行う")
+    args = parser.parse_args()
+
+    with open(args.operations, 'r', encoding='utf-8') as f:
+        operations = resolve_operations(json.load(f), load_aliases(args.aliases))
+    questions = list(iter_questions(args.target))
+    print(f"編集前の問題数: {len(questions)}")
+
+    try:
+        result, remap = apply_operations(questions, operations)
+    except ValueError as e:
+        print(f"❌ 操作の検証に失敗しました:\n{e}")
+        sys.exit(1)
+
+    deleted_count = sum(1 for new_id in remap.values() if new_id is None)
+    print(f"削除: {deleted_count}件 / 編集: {len(operations.get('edit', {}))}件 / "
+          f"移動: {len(operations.get('move', []))}件 / ID変更: {len(remap) - deleted_count}件")
+    print(f"編集後の問題数: {len(result)}")
+
+    if args.dry_run:
+        print("\n--dry-run のためファイルは更新しません")
+        return
+    write_questions(result, args.target)
+    print(f"\n✅ {args.target.name}を更新しました")
+    if args.remap_out:
+        content = json.dumps(remap, ensure_ascii=False, indent=2).encode('utf-8')
+        write_bytes_atomic(args.remap_out, content)
+        print(f"ID対応表を {args.remap_out} に保存しました")
+
+
+if __name__ == "__main__":
+    main()
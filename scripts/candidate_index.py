@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重複チェック用の候補絞り込みインデックス
+文字n-gram・キーワード・選択肢の転置インデックスから、
+類似度計算が必要な候補だけを返す
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+
+def char_ngrams(text: str, n: int = 2) -> Set[str]:
+    """文字n-gramの集合を作成"""
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class CandidateIndex:
+    """問題の特徴量に対する転置インデックス
+
+    features は check_duplicates.question_features() の戻り値
+    （'text', 'terms', 'options' を持つ辞書）を想定する。
+    """
+
+    def __init__(self, ngram_size: int = 2, min_score: float = 0.2,
+                 max_df_ratio: float = 0.3, min_df_cap: int = 20):
+        self.ngram_size = ngram_size
+        self.min_score = min_score
+        self.max_df_ratio = max_df_ratio
+        self.min_df_cap = min_df_cap
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.docs: List[Dict[str, Set[str]]] = []
+        self._stop_keys: Optional[Set[str]] = None
+        self._gram_counts: List[int] = []
+        self._removed = 0
+
+    def __len__(self) -> int:
+        return len(self.docs) - self._removed
+
+    def _keys(self, features: Dict) -> Dict[str, Set[str]]:
+        return {
+            'g': char_ngrams(features['text'], self.ngram_size),
+            't': set(features['terms']),
+            'o': set(features['options']),
+        }
+
+    def add(self, features: Dict) -> int:
+        """特徴量を登録し、文書番号を返す"""
+        doc_id = len(self.docs)
+        keys = self._keys(features)
+        self.docs.append(keys)
+        for kind, values in keys.items():
+            for value in values:
+                self.postings[f"{kind}:{value}"].append(doc_id)
+        self._stop_keys = None
+        return doc_id
+
+    def remove(self, doc_id: int):
+        """文書を転置インデックスから外す（文書番号は詰めない）"""
+        for kind, values in self.docs[doc_id].items():
+            for value in values:
+                self.postings[f"{kind}:{value}"].remove(doc_id)
+        self.docs[doc_id] = {'g': set(), 't': set(), 'o': set()}
+        self._removed += 1
+        self._stop_keys = None
+
+    def _finalize(self):
+        """頻出n-gram（ストップグラム）を確定する"""
+        max_df = max(self.min_df_cap, int(len(self) * self.max_df_ratio))
+        self._stop_keys = {
+            key for key, ids in self.postings.items()
+            if key.startswith('g:') and len(ids) > max_df
+        }
+        self._gram_counts = [
+            sum(1 for g in doc['g'] if f"g:{g}" not in self._stop_keys)
+            for doc in self.docs
+        ]
+
+    def candidates(self, features: Dict, exclude: Optional[int] = None) -> List[int]:
+        """類似度が min_score を超えうる文書番号を昇順で返す"""
+        if self._stop_keys is None:
+            self._finalize()
+
+        keys = self._keys(features)
+        shared = defaultdict(lambda: [0, 0, 0])
+        slot = {'g': 0, 't': 1, 'o': 2}
+        gram_count = 0
+        for kind, values in keys.items():
+            for value in values:
+                key = f"{kind}:{value}"
+                if key in self._stop_keys:
+                    continue
+                if kind == 'g':
+                    gram_count += 1
+                for doc_id in self.postings.get(key, ()):
+                    shared[doc_id][slot[kind]] += 1
+
+        result = []
+        for doc_id, (g, t, o) in shared.items():
+            if doc_id == exclude:
+                continue
+            doc = self.docs[doc_id]
+            # n-gramのDice係数で問題文類似度を近似し、Jaccardは正確に求める
+            gram_total = gram_count + self._gram_counts[doc_id]
+            text_estimate = 2 * g / gram_total if gram_total else 0.0
+            term_union = len(keys['t']) + len(doc['t']) - t
+            option_union = len(keys['o']) + len(doc['o']) - o
+            estimate = (
+                text_estimate * 0.5 +
+                (t / term_union if term_union else 0.0) * 0.3 +
+                (o / option_union if option_union else 0.0) * 0.2
+            )
+            if estimate >= self.min_score:
+                result.append(doc_id)
+        return sorted(result)
@@ -5,86 +5,125 @@
 追加された問題と既存問題の意味的重複を検証
 """
 
-import json
+import argparse
+import cProfile
 import re
+import time
+import unicodedata
 from pathlib import Path
-from typing import List, Dict, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Dict, Optional, Set, Tuple
 from difflib import SequenceMatcher
 
+from batch_similarity import HAS_NUMPY, batch_candidates
+from candidate_index import CandidateIndex
+from feature_cache import DEFAULT_CACHE_PATH, DEFAULT_PAIR_CACHE_PATH, FeatureCache, PairScoreCache
+from gazetteer import TermAutomaton, build_gazetteer
+from profiling import StageProfiler
+from question_diff import DEFAULT_SNAPSHOT_PATH, diff_questions, load_baseline, save_snapshot
+from question_io import iter_questions
+from text_normalize import normalize_text
+
 def load_json_file(file_path: str) -> List[Dict]:
-    """JSONファイルから問題を読み込み"""
+    """JSONファイルから問題を読み込み（重複チェックに不要な解説は読み込まない）"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get('questions', [])
+        return list(iter_questions(file_path, exclude=['explanation']))
     except FileNotFoundError:
         print(f"ファイルが見つかりません: {file_path}")
         return []
 
-def normalize_text(text: str) -> str:
-    """テキストを正規化（比較用）"""
-    # 全角・半角統一、記号除去、空白除去
-    text = re.sub(r'[（）()【】「」『』\s]', '', text)
-    text = text.replace('？', '').replace('?', '')
-    text = text.replace('。', '').replace('、', '')
-    return text.lower()
+# 比較する範囲（--scope）の表示名
+SCOPE_LABELS = {'bucket': '同カテゴリ内', 'level': '同じ級の中', 'all': '全問題の中'}
+
+# --profile で組み合わせ数を数える類似度の閾値
+PROFILE_THRESHOLDS = (0.4, 0.6, 0.7)
+
+# 重要なキーワードパターン
+KEY_TERM_PATTERNS = [
+    re.compile(r'[年代]\d+年'),  # 年代
+    re.compile(r'[平鎌室江明大昭]\w+時代'),  # 時代名
+    re.compile(r'\w+[寺院神社]'),  # 寺社名
+    re.compile(r'\w+[天皇将軍]'),  # 人物
+    re.compile(r'\w+[祭り祭]'),  # 祭り
+    re.compile(r'\w+[通り道]'),  # 地名
+    re.compile(r'\w+[織焼]'),  # 工芸品
+]
+# 重要な固有名詞（カタカナ、漢字の連続）
+PROPER_NOUN_PATTERN = re.compile(r'[ア-ヲ]{2,}|[一-龯]{2,}')
 
 def extract_key_terms(question: str) -> Set[str]:
-    """問題文からキーワードを抽出"""
-    # 重要なキーワードパターン
-    patterns = [
-        r'[年代]\d+年',  # 年代
-        r'[平鎌室江明大昭]\w+時代',  # 時代名
-        r'\w+[寺院神社]',  # 寺社名
-        r'\w+[天皇将軍]',  # 人物
-        r'\w+[祭り祭]',  # 祭り
-        r'\w+[通り道]',  # 地名
-        r'\w+[織焼]',  # 工芸品
-    ]
-    
+    """問題文からキーワードを抽出（全角・半角の違いは NFKC でそろえる）"""
     terms = set()
-    text = question
+    text = unicodedata.normalize('NFKC', question)
     
     # パターンマッチング
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        terms.update(matches)
+    for pattern in KEY_TERM_PATTERNS:
+        terms.update(pattern.findall(text))
     
-    # 重要な固有名詞を抽出（カタカナ、漢字の連続）
-    proper_nouns = re.findall(r'[ア-ヲ]{2,}|[一-龯]{2,}', text)
-    terms.update([noun for noun in proper_nouns if len(noun) >= 2])
+    # 重要な固有名詞を抽出
+    terms.update(PROPER_NOUN_PATTERN.findall(text))
     
     return terms
 
-def calculate_similarity(q1: Dict, q2: Dict) -> Tuple[float, str]:
-    """2つの問題の類似度を計算"""
-    
-    # 問題文の類似度
-    text1 = normalize_text(q1['question'])
-    text2 = normalize_text(q2['question'])
-    text_similarity = SequenceMatcher(None, text1, text2).ratio()
+def question_features(q: Dict, gazetteer: Optional[TermAutomaton] = None) -> Dict:
+    """類似度計算に使う特徴量（正規化問題文・キーワード・選択肢）を算出
+
+    gazetteer を渡した場合はキーワードを固有名詞辞書から抽出する
+    """
+    text = normalize_text(q['question'])
+    return {
+        'text': text,
+        'terms': gazetteer.find(text) if gazetteer else extract_key_terms(q['question']),
+        'options': set(normalize_text(opt) for opt in q['options']),
+    }
+
+def calculate_similarity(q1: Dict, q2: Dict, min_score: Optional[float] = None) -> Optional[Tuple[float, str]]:
+    """2つの問題の類似度を計算（min_score については calculate_feature_similarity を参照）"""
+    return calculate_feature_similarity(question_features(q1), question_features(q2), min_score)
+
+def jaccard(set1: Set[str], set2: Set[str]) -> float:
+    """2つの集合の Jaccard 係数（どちらも空なら 0）"""
+    if len(set1) == 0 and len(set2) == 0:
+        return 0.0
+    total = set1 | set2
+    return len(set1 & set2) / len(total) if total else 0.0
+
+def calculate_feature_similarity(f1: Dict, f2: Dict,
+                                 min_score: Optional[float] = None) -> Optional[Tuple[float, str]]:
+    """算出済みの特徴量から2つの問題の類似度を計算
+
+    min_score を指定すると、キーワードと選択肢の重複度に問題文類似度の上限
+    （SequenceMatcher の real_quick_ratio / quick_ratio）を加えた値が min_score 以下の
+    組み合わせは ratio() を計算せずに None を返す。min_score を超える組み合わせの
+    類似度と理由は指定しない場合と同じになる
+    """
+    scored = score_features(f1, f2, min_score)
+    if scored is None or (min_score is not None and scored[0] <= min_score):
+        return None
+    return scored
+
+def score_features(f1: Dict, f2: Dict, min_score: Optional[float] = None) -> Optional[Tuple[float, str]]:
+    """類似度と理由を計算（上限の見積もりで min_score 以下と分かった場合のみ None）
+
+    ratio() まで計算した組み合わせは min_score 以下でも類似度を返す（類似度キャッシュ用）
+    """
     
     # キーワードの重複度
-    terms1 = extract_key_terms(q1['question'])
-    terms2 = extract_key_terms(q2['question'])
-    
-    if len(terms1) == 0 and len(terms2) == 0:
-        keyword_similarity = 0.0
-    else:
-        common_terms = terms1 & terms2
-        total_terms = terms1 | terms2
-        keyword_similarity = len(common_terms) / len(total_terms) if total_terms else 0.0
+    terms1 = f1['terms']
+    terms2 = f2['terms']
+    keyword_similarity = jaccard(terms1, terms2)
     
     # 選択肢の類似度
-    options1 = set(normalize_text(opt) for opt in q1['options'])
-    options2 = set(normalize_text(opt) for opt in q2['options'])
+    option_similarity = jaccard(f1['options'], f2['options'])
     
-    if len(options1) == 0 and len(options2) == 0:
-        option_similarity = 0.0
-    else:
-        common_options = options1 & options2
-        total_options = options1 | options2
-        option_similarity = len(common_options) / len(total_options) if total_options else 0.0
+    # 問題文の類似度（上限で足りない組み合わせは打ち切る）
+    matcher = SequenceMatcher(None, f1['text'], f2['text'])
+    if min_score is not None:
+        for upper_bound in (matcher.real_quick_ratio, matcher.quick_ratio):
+            if upper_bound() * 0.5 + keyword_similarity * 0.3 + option_similarity * 0.2 <= min_score:
+                return None
+    text_similarity = matcher.ratio()
     
     # 総合類似度（重み付け平均）
     total_similarity = (
@@ -100,7 +139,7 @@ def calculate_similarity(q1: Dict, q2: Dict) -> Tuple[float, str]:
     if keyword_similarity > 0.5:
         reasons.append(f"キーワード重複: {keyword_similarity:.2f}")
         if len(terms1 & terms2) > 0:
-            reasons.append(f"共通キーワード: {', '.join(list(terms1 & terms2)[:3])}")
+            reasons.append(f"共通キーワード: {', '.join(sorted(terms1 & terms2)[:3])}")
     if option_similarity > 0.5:
         reasons.append(f"選択肢重複: {option_similarity:.2f}")
     
@@ -108,55 +147,375 @@ def calculate_similarity(q1: Dict, q2: Dict) -> Tuple[float, str]:
     
     return total_similarity, reason
 
-def check_duplicates_comprehensive():
-    """包括的な重複チェック"""
+def bucket_key(q: Dict, scope: str = 'bucket') -> Tuple[str, ...]:
+    """比較対象をまとめるキー
+
+    scope は 'bucket'（級とカテゴリが同じ問題）, 'level'（級が同じ問題）,
+    'all'（すべての問題）のいずれか
+    """
+    if scope == 'all':
+        return ()
+    if scope == 'level':
+        return (q['level'],)
+    return (q['level'], q['category'])
+
+def group_by_bucket(questions: List[Dict], scope: str = 'bucket') -> Dict[Tuple[str, ...], List[int]]:
+    """bucket_key ごとに questions の位置をまとめる"""
+    buckets = {}
+    for pos, q in enumerate(questions):
+        buckets.setdefault(bucket_key(q, scope), []).append(pos)
+    return buckets
+
+def boundary_flags(q1: Dict, q2: Dict) -> List[str]:
+    """2つの問題の級・カテゴリが異なる場合の注記"""
+    flags = []
+    if q1['level'] != q2['level']:
+        flags.append(f"級をまたぐ: {q1['level']} / {q2['level']}")
+    if q1['category'] != q2['category']:
+        flags.append(f"カテゴリをまたぐ: {q1['category']} / {q2['category']}")
+    return flags
+
+def chunked(items: List, size: int) -> List[List]:
+    """リストを size 件ずつに分割"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def candidate_lists(query_items: List[Tuple[int, Dict]], items: List[Tuple[int, Dict]],
+                    engine: str) -> List[List[int]]:
+    """query ごとに比較対象となる items の添字リストを返す
+
+    engine は 'index'（転置インデックス）, 'batch'（行列演算による一括推定）,
+    'exhaustive'（全件）のいずれか
+    """
+    if engine == 'exhaustive':
+        return [list(range(len(items)))] * len(query_items)
+    if engine == 'batch':
+        return batch_candidates([f for _, f in query_items], [f for _, f in items])
+    index = CandidateIndex()
+    for _, features in items:
+        index.add(features)
+    return [index.candidates(features) for _, features in query_items]
+
+def new_scan_stats(pairs_in_bucket: int, floor: float = 0.0) -> Dict[str, Dict]:
+    """scan_best_matches / scan_pairs の計測値の初期値
+
+    pairs_bound_pruned は上限の見積もりで打ち切り、ratio() を計算しなかった組み合わせの数。
+    pairs_ratio_computed は ratio() まで計算した組み合わせの数（下限以下だったものを含む）。
+    pair_cache_hits は類似度キャッシュの値を使った組み合わせの数。
+    pairs_kept はその時点の下限（scan_pairs では閾値、scan_best_matches ではそれまでの
+    最良一致の類似度か 0.4）を超えて採用した組み合わせの数で、pairs_kept_over_* はその内訳。
+    下限より低い閾値の内訳は意味を持たないため、floor 以上の閾値だけを数える
+    """
+    counters = {'pairs_in_bucket': pairs_in_bucket, 'pairs_bound_pruned': 0, 'pairs_ratio_computed': 0,
+                'pair_cache_hits': 0, 'pairs_kept': 0}
+    counters.update({f"pairs_kept_over_{threshold}": 0 for threshold in PROFILE_THRESHOLDS if threshold >= floor})
+    return {'timings': {'scoring': 0.0}, 'counters': counters}
+
+def count_kept(stats: Dict[str, Dict], similarity: Optional[float]):
+    """下限を超えて採用した組み合わせを閾値ごとに数える（None は採用しなかった組み合わせ）"""
+    if similarity is None:
+        return
+    counters = stats['counters']
+    counters['pairs_kept'] += 1
+    for threshold in PROFILE_THRESHOLDS:
+        name = f"pairs_kept_over_{threshold}"
+        if name in counters and similarity > threshold:
+            counters[name] += 1
+
+def cached_score(f1: Dict, f2: Dict, min_score: float,
+                 scores: Optional[Dict[str, Dict[str, Tuple[float, Optional[str]]]]],
+                 used: List[Tuple[str, str, float, Optional[str]]],
+                 stats: Dict[str, Dict]) -> Optional[Tuple[float, str]]:
+    """類似度キャッシュ（scores）を参照して calculate_feature_similarity と同じ結果を返す
+
+    scores は PairScoreCache.table() の値（None でキャッシュなし）。理由が None の値は
+    「類似度はこの値以下」という上限を表す。キャッシュを使う場合は参照・計算した値を used に追加する。
+    打ち切り・ratio() の計算・キャッシュの利用を stats に数える
+    """
+    counters = stats['counters']
+    known = scores.get(f1['hash'], {}).get(f2['hash']) if scores is not None else None
+    if known is not None and (known[1] is not None or known[0] <= min_score):
+        counters['pair_cache_hits'] += 1
+        scored = known
+    else:
+        scored = score_features(f1, f2, min_score)
+        if scored is None:
+            counters['pairs_bound_pruned'] += 1
+            scored = (min_score, None)  # 上限の見積もりで打ち切った
+        else:
+            counters['pairs_ratio_computed'] += 1
+    if scores is not None:
+        used.append((f1['hash'], f2['hash']) + tuple(scored))
+    if scored[1] is None or scored[0] <= min_score:
+        return None
+    return tuple(scored)
+
+def prefixed_stats(stats: Dict[str, Dict], prefix: str) -> Dict[str, Dict]:
+    """計測値の名前に段階の接頭辞を付ける"""
+    return {kind: {f"{prefix}.{name}": value for name, value in values.items()}
+            for kind, values in stats.items()}
+
+def find_candidates(task) -> Tuple[List[List[int]], float]:
+    """バケット1つ分の候補リストを作る（候補絞り込みのインデックスはバケットごとに1回だけ作る）
+
+    task は (query の (位置, 特徴量) リスト, 比較対象の (位置, 特徴量) リスト, engine)。
+    戻り値は candidate_lists の結果とかかった秒数
+    """
+    query_items, items, engine = task
+    start = time.perf_counter()
+    targets = candidate_lists(query_items, items, engine)
+    return targets, time.perf_counter() - start
+
+def scan_best_matches(task) -> Tuple[List[Tuple[int, int, float, str]], Dict[str, Dict], List]:
+    """新規問題ごとに同じバケット内の既存問題から最良一致を探す
+
+    task は (新規問題の (位置, 特徴量) リスト, 既存問題の (位置, 特徴量) リスト,
+    新規問題ごとの候補リスト, 類似度キャッシュの表)。プロセスプールから呼ばれるため
+    モジュールのトップレベルに置く。戻り値は 0.4 を超えた問題の
+    (新規位置, 既存位置, 類似度, 理由) のリストと計測値、類似度キャッシュに登録する値
+    """
+    new_items, existing_items, targets, scores = task
+    used = []
+    stats = new_scan_stats(len(new_items) * len(existing_items))
+    
+    start = time.perf_counter()
+    results = []
+    for (new_pos, new_f), candidates in zip(new_items, targets):
+        best = None
+        for k in candidates:
+            existing_pos, existing_f = existing_items[k]
+            # 閾値: 40%以上で要注意（見つかった最良一致を超えない組み合わせは打ち切る）
+            scored = cached_score(new_f, existing_f, best[2] if best else 0.4, scores, used, stats)
+            count_kept(stats, scored[0] if scored else None)
+            if scored:
+                best = (new_pos, existing_pos) + scored
+        if best:
+            results.append(best)
+    stats['timings']['scoring'] += time.perf_counter() - start
+    return results, stats, used
+
+def scan_pairs(task) -> Tuple[List[Tuple[int, int, float, str]], Dict[str, Dict], List]:
+    """同じバケット内の組み合わせ (i < j) で閾値を超えるものを探す
+
+    task は (バケット内の (位置, 特徴量) リスト, 担当する行の添字リスト, 行ごとの候補リスト, 閾値,
+    類似度キャッシュの表)。大きなバケットは行単位で分割して複数のワーカーに割り当てる
+    """
+    items, rows, targets, threshold, scores = task
+    used = []
+    stats = new_scan_stats(sum(len(items) - 1 - row for row in rows), threshold)
+    
+    start = time.perf_counter()
+    results = []
+    for row, candidates in zip(rows, targets):
+        pos1, f1 = items[row]
+        for k in candidates:
+            if k <= row:
+                continue
+            pos2, f2 = items[k]
+            scored = cached_score(f1, f2, threshold, scores, used, stats)
+            count_kept(stats, scored[0] if scored else None)
+            if scored:
+                results.append((pos1, pos2) + scored)
+    stats['timings']['scoring'] += time.perf_counter() - start
+    return results, stats, used
+
+def run_tasks(func, tasks: List, workers: int) -> List:
+    """タスクを順に実行（workers > 1 ならプロセスプールで並列実行）
+
+    結果はタスクの順序どおりに返すため、並列実行でも出力は逐次実行と一致する
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        return [func(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, tasks))
+
+def detect_duplicates(existing_questions: List[Dict], new_questions: List[Dict],
+                      engine: str = 'index', workers: int = 1, chunk_size: int = 50,
+                      scope: str = 'bucket', pair_threshold: float = 0.6,
+                      feature_cache: Optional[FeatureCache] = None,
+                      pair_cache: Optional[PairScoreCache] = None,
+                      profiler: Optional[StageProfiler] = None
+                      ) -> Tuple[Dict[int, Tuple[int, float, str]], List[Tuple[int, int, float, str]]]:
+    """新規問題と既存問題・新規問題間の類似を検出（表示は行わない）
+
+    戻り値は (新規位置 → (既存位置, 類似度, 理由) の最良一致,
+    pair_threshold を超えた新規問題間の (位置1, 位置2, 類似度, 理由) を位置順に並べたもの)。
+    scope で比較する範囲を広げられる（bucket_key を参照）。
+    候補絞り込みのインデックスはバケットごとに1回だけ作り、並列実行では類似度の計算だけを
+    chunk_size 問ずつに分割する（逐次実行では分割しない）。
+    pair_cache を渡すと、前回までに計算した組み合わせの類似度を再利用する。
+    profiler を渡すと段階ごとの時間と比較した組み合わせの数を記録する
+    """
+    profiler = profiler or StageProfiler()
+    if feature_cache is None:
+        feature_cache = FeatureCache(question_features, None)
+    with profiler.stage('features'):
+        # 類似度キャッシュのキーとして内容ハッシュを持たせる
+        existing_features = [feature_cache.get(q) for q in existing_questions]
+        new_features = [feature_cache.get(q) for q in new_questions]
+        feature_cache.save()
+    profiler.count('feature_cache.hits', feature_cache.hits)
+    profiler.count('feature_cache.misses', feature_cache.misses)
+    
+    # 同じバケット（既定では同じ級とカテゴリ）の問題のみチェック
+    existing_buckets = group_by_bucket(existing_questions, scope)
+    new_buckets = group_by_bucket(new_questions, scope)
+    
+    # 候補リストはバケットごとに1回だけ作り、類似度の計算だけを分割して並列実行する
+    buckets = []
+    for key, new_positions in sorted(new_buckets.items()):
+        new_items = [(pos, new_features[pos]) for pos in new_positions]
+        existing_items = [(pos, existing_features[pos]) for pos in existing_buckets.get(key, [])]
+        buckets.append((new_items, existing_items))
+    size = chunk_size if workers > 1 else None
+    
+    best_matches = {}
+    with profiler.stage('new_vs_existing'):
+        candidate_tasks = [(new_items, existing_items, engine)
+                           for new_items, existing_items in buckets if existing_items]
+        match_tasks = []
+        for (new_items, existing_items, _), (targets, seconds) in zip(
+                candidate_tasks, run_tasks(find_candidates, candidate_tasks, workers)):
+            profiler.add_time('new_vs_existing.candidates', seconds)
+            step = size or len(new_items)
+            for first in range(0, len(new_items), step):
+                chunk = new_items[first:first + step]
+                scores = pair_cache.table(f['hash'] for _, f in chunk) if pair_cache else None
+                match_tasks.append((chunk, existing_items, targets[first:first + step], scores))
+        for results, stats, used in run_tasks(scan_best_matches, match_tasks, workers):
+            profiler.merge(prefixed_stats(stats, 'new_vs_existing'))
+            if pair_cache:
+                pair_cache.record(used, stats['counters']['pair_cache_hits'])
+            for new_pos, existing_pos, similarity, reason in results:
+                best_matches[new_pos] = (existing_pos, similarity, reason)
+    
+    pair_results = []
+    with profiler.stage('new_vs_new'):
+        candidate_tasks = [(new_items, new_items, engine) for new_items, _ in buckets]
+        pair_tasks = []
+        for (new_items, _, _), (targets, seconds) in zip(
+                candidate_tasks, run_tasks(find_candidates, candidate_tasks, workers)):
+            profiler.add_time('new_vs_new.candidates', seconds)
+            rows = list(range(len(new_items)))
+            for chunk in chunked(rows, size or len(rows)):
+                scores = pair_cache.table(new_items[row][1]['hash'] for row in chunk) if pair_cache else None
+                # 新規問題間は既定で60%以上で要注意
+                pair_tasks.append((new_items, chunk, targets[chunk[0]:chunk[-1] + 1], pair_threshold, scores))
+        for results, stats, used in run_tasks(scan_pairs, pair_tasks, workers):
+            profiler.merge(prefixed_stats(stats, 'new_vs_new'))
+            if pair_cache:
+                pair_cache.record(used, stats['counters']['pair_cache_hits'])
+            pair_results.extend(results)
+        pair_results.sort(key=lambda r: (r[0], r[1]))
+    if pair_cache:
+        pair_cache.save()
+    
+    # バケットが異なるため比較しなかった組み合わせ
+    all_pairs = {
+        'new_vs_existing': len(new_questions) * len(existing_questions),
+        'new_vs_new': len(new_questions) * (len(new_questions) - 1) // 2,
+    }
+    for prefix, total in all_pairs.items():
+        in_bucket = profiler.counters.get(f"{prefix}.pairs_in_bucket", 0)
+        profiler.count(f"{prefix}.pairs_total", total)
+        profiler.count(f"{prefix}.pairs_skipped_by_bucket", total - in_bucket)
+    return best_matches, pair_results
+
+def check_duplicates_comprehensive(engine: str = 'index', workers: int = 1,
+                                   chunk_size: int = 50,
+                                   cache_path: Optional[Path] = DEFAULT_CACHE_PATH,
+                                   terms: str = 'regex',
+                                   scope: str = 'bucket',
+                                   pair_cache_path: Optional[Path] = DEFAULT_PAIR_CACHE_PATH,
+                                   baseline: Optional[str] = None,
+                                   max_existing_id: int = 487,
+                                   snapshot: bool = False,
+                                   profiler: Optional[StageProfiler] = None):
+    """包括的な重複チェック
+
+    engine='index' では候補絞り込みインデックス、engine='batch' では行列演算の
+    一括推定で類似の可能性がある組み合わせだけを SequenceMatcher にかける。
+    workers > 1 の場合は（級, カテゴリ）単位、大きなバケットは
+    chunk_size 問ずつに分割してプロセスプールで並列実行する。
+    特徴量は cache_path、組み合わせごとの類似度は pair_cache_path のキャッシュから
+    再利用する（None でキャッシュ無効）。
+    terms='gazetteer' では選択肢から作った固有名詞辞書でキーワードを抽出する。
+    scope='level' / 'all' では級・カテゴリをまたいで比較し、またいだ組み合わせに注記を付ける。
+    baseline（question_diff.load_baseline を参照）を指定すると、基準から追加・変更された
+    問題だけを新規問題として、変更のない問題と比較する（追加ファイルは読み込まない）。
+    指定しない場合は max_existing_id 以下のIDを既存問題とみなす。
+    snapshot=True では現在の内容をスナップショットとして保存し、次回の基準にできる。
+    profiler を渡すと段階ごとの時間と比較した組み合わせの数を記録する
+    """
+    profiler = profiler or StageProfiler()
     
     # 既存の問題を読み込み（新規追加前のデータが必要）
     # まず現在のquestions.jsonから新規追加分を除いた元データを推定
-    current_questions = load_json_file("public/data/questions.json")
-    new_3kyuu = load_json_file("additional_3kyuu_questions.json")
-    new_2kyuu = load_json_file("additional_2kyuu_questions.json")
+    with profiler.stage('load'):
+        current_questions = load_json_file("public/data/questions.json")
+        if baseline is None:
+            new_3kyuu = load_json_file("additional_3kyuu_questions.json")
+            new_2kyuu = load_json_file("additional_2kyuu_questions.json")
     
     print("=== 重複チェック開始 ===")
     print(f"現在の総問題数: {len(current_questions)}")
-    print(f"新規3級問題: {len(new_3kyuu)}")
-    print(f"新規2級問題: {len(new_2kyuu)}")
-    
-    # 既存問題を推定（新規追加分を除く）
-    # IDの範囲から推定
-    max_existing_id = 487  # 作業前の問題数
-    existing_questions = [q for q in current_questions 
-                         if q['id'].startswith('q') and 
-                         int(q['id'][1:]) <= max_existing_id]
-    
-    print(f"既存問題数（推定）: {len(existing_questions)}")
     
-    # 新規追加問題をまとめる
-    all_new_questions = new_3kyuu + new_2kyuu
+    if baseline is not None:
+        # 基準と内容ハッシュで比べ、追加・変更された問題だけを新規問題として確認
+        with profiler.stage('diff'):
+            diff = diff_questions(current_questions, load_baseline(baseline))
+        print(f"基準: {baseline}")
+        print(f"追加: {len(diff['added'])}問 / 変更: {len(diff['changed'])}問 / 削除: {len(diff['removed'])}問")
+        existing_questions = [current_questions[pos] for pos in diff['unchanged']]
+        all_new_questions = [current_questions[pos] for pos in sorted(diff['added'] + diff['changed'])]
+        print(f"既存問題数（変更なし）: {len(existing_questions)}")
+    else:
+        print(f"新規3級問題: {len(new_3kyuu)}")
+        print(f"新規2級問題: {len(new_2kyuu)}")
+        
+        # 既存問題を推定（新規追加分を除く）
+        # IDの範囲から推定（既定の 487 は作業前の問題数）
+        existing_questions = [q for q in current_questions 
+                             if q['id'].startswith('q') and 
+                             int(q['id'][1:]) <= max_existing_id]
+        
+        print(f"既存問題数（推定）: {len(existing_questions)}")
+        
+        # 新規追加問題をまとめる
+        all_new_questions = new_3kyuu + new_2kyuu
     
     duplicates_found = []
     high_similarity_pairs = []
     
+    if terms == 'gazetteer':
+        with profiler.stage('gazetteer'):
+            gazetteer = build_gazetteer(current_questions + all_new_questions, normalize_text)
+        print(f"固有名詞辞書: {len(gazetteer)}語")
+        feature_cache = FeatureCache(partial(question_features, gazetteer=gazetteer), cache_path,
+                                     variant='gazetteer', terms=gazetteer.terms)
+    else:
+        feature_cache = FeatureCache(question_features, cache_path)
+    pair_cache = PairScoreCache(pair_cache_path) if pair_cache_path else None
+    best_matches, pair_results = detect_duplicates(existing_questions, all_new_questions,
+                                                   engine=engine, workers=workers,
+                                                   chunk_size=chunk_size,
+                                                   scope=scope,
+                                                   feature_cache=feature_cache,
+                                                   pair_cache=pair_cache,
+                                                   profiler=profiler)
+    
+    report_start = time.perf_counter()
     print("\n=== 新規問題 vs 既存問題の重複チェック ===")
     
-    for new_q in all_new_questions:
+    for new_pos, new_q in enumerate(all_new_questions):
         print(f"\n📝 新規問題: {new_q['id']} ({new_q['level']}, {new_q['category']})")
         print(f"   問題: {new_q['question'][:60]}...")
         
         best_match = None
         best_similarity = 0.0
-        
-        for existing_q in existing_questions:
-            # 同じ級とカテゴリの問題のみチェック
-            if (new_q['level'] == existing_q['level'] and 
-                new_q['category'] == existing_q['category']):
-                
-                similarity, reason = calculate_similarity(new_q, existing_q)
-                
-                if similarity > 0.4:  # 閾値: 40%以上で要注意
-                    if similarity > best_similarity:
-                        best_similarity = similarity
-                        best_match = existing_q
+        best_reason = ""
+        if new_pos in best_matches:
+            existing_pos, best_similarity, best_reason = best_matches[new_pos]
+            best_match = existing_questions[existing_pos]
         
         if best_match:
             if best_similarity > 0.7:  # 70%以上で重複とみなす
@@ -164,7 +523,8 @@ def check_duplicates_comprehensive():
                     'new_question': new_q,
                     'existing_question': best_match,
                     'similarity': best_similarity,
-                    'reason': reason
+                    'reason': best_reason,
+                    'flags': boundary_flags(new_q, best_match)
                 })
                 print(f"   ⚠️ 重複疑い: {best_similarity:.2f} - {best_match['question'][:40]}...")
             elif best_similarity > 0.4:  # 40%以上で類似として報告
@@ -172,32 +532,27 @@ def check_duplicates_comprehensive():
                     'new_question': new_q,
                     'existing_question': best_match,
                     'similarity': best_similarity,
-                    'reason': reason
+                    'reason': best_reason,
+                    'flags': boundary_flags(new_q, best_match)
                 })
                 print(f"   ⚡ 類似注意: {best_similarity:.2f} - {best_match['question'][:40]}...")
             else:
                 print(f"   ✅ 問題なし: {best_similarity:.2f}")
         else:
-            print(f"   ✅ 同カテゴリ内で重複なし")
+            print(f"   ✅ {SCOPE_LABELS[scope]}で重複なし")
     
     print("\n=== 新規問題間の重複チェック ===")
     
     new_vs_new_duplicates = []
     
-    for i, q1 in enumerate(all_new_questions):
-        for j, q2 in enumerate(all_new_questions[i+1:], i+1):
-            if (q1['level'] == q2['level'] and 
-                q1['category'] == q2['category']):
-                
-                similarity, reason = calculate_similarity(q1, q2)
-                
-                if similarity > 0.6:  # 新規問題間は60%で要注意
-                    new_vs_new_duplicates.append({
-                        'question1': q1,
-                        'question2': q2,
-                        'similarity': similarity,
-                        'reason': reason
-                    })
+    for pos1, pos2, similarity, reason in pair_results:
+        new_vs_new_duplicates.append({
+            'question1': all_new_questions[pos1],
+            'question2': all_new_questions[pos2],
+            'similarity': similarity,
+            'reason': reason,
+            'flags': boundary_flags(all_new_questions[pos1], all_new_questions[pos2])
+        })
     
     # 結果報告
     print("\n" + "="*60)
@@ -211,6 +566,8 @@ def check_duplicates_comprehensive():
             print(f"新規: {dup['new_question']['question']}")
             print(f"既存: {dup['existing_question']['question']}")
             print(f"理由: {dup['reason']}")
+            if dup['flags']:
+                print(f"注記: {' | '.join(dup['flags'])}")
     else:
         print(f"\n✅ 重複問題: 0件")
     
@@ -221,6 +578,8 @@ def check_duplicates_comprehensive():
             print(f"新規: {pair['new_question']['question']}")
             print(f"既存: {pair['existing_question']['question']}")
             print(f"理由: {pair['reason']}")
+            if pair['flags']:
+                print(f"注記: {' | '.join(pair['flags'])}")
     else:
         print(f"\n✅ 類似問題（要確認）: 0件")
     
@@ -230,6 +589,8 @@ def check_duplicates_comprehensive():
             print(f"\n類似度: {dup['similarity']:.2f}")
             print(f"問題1: {dup['question1']['question']}")
             print(f"問題2: {dup['question2']['question']}")
+            if dup['flags']:
+                print(f"注記: {' | '.join(dup['flags'])}")
     else:
         print(f"\n✅ 新規問題間重複: 0件")
     
@@ -243,8 +604,74 @@ def check_duplicates_comprehensive():
     for key, count in sorted(category_stats.items()):
         level, category = key.split('_', 1)
         print(f"  {level} {category}: {count}問")
+    profiler.add_time('report', time.perf_counter() - report_start)
+    
+    if snapshot:
+        save_snapshot(current_questions)
+        print(f"\nスナップショットを {DEFAULT_SNAPSHOT_PATH} に保存しました（--baseline snapshot で使用）")
     
     return duplicates_found, high_similarity_pairs, new_vs_new_duplicates
 
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="追加問題と既存問題の重複チェック")
+    parser.add_argument('--engine', choices=['index', 'batch', 'exhaustive'], default='index',
+                        help="候補の絞り込み方法（batch は NumPy が必要）")
+    parser.add_argument('--exhaustive', action='store_true',
+                        help="候補を絞り込まず同カテゴリの全組み合わせを比較（--engine exhaustive と同じ）")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="並列実行するプロセス数（既定: 1 = 逐次実行）")
+    parser.add_argument('--chunk-size', type=int, default=50,
+                        help="大きなバケットを分割する単位（新規問題数）")
+    parser.add_argument('--terms', choices=['regex', 'gazetteer'], default='regex',
+                        help="キーワード抽出方法（gazetteer は選択肢から作った固有名詞辞書）")
+    parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE_PATH,
+                        help="特徴量キャッシュのファイル")
+    parser.add_argument('--pair-cache', type=Path, default=DEFAULT_PAIR_CACHE_PATH,
+                        help="組み合わせごとの類似度キャッシュのファイル")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="特徴量キャッシュと類似度キャッシュを使わない")
+    parser.add_argument('--scope', choices=list(SCOPE_LABELS), default='bucket',
+                        help="比較する範囲（bucket: 級とカテゴリが同じ問題, level: 級が同じ問題, all: すべて）")
+    parser.add_argument('--baseline',
+                        help="基準（問題ファイルのパス、git:<リビジョン>、snapshot）から追加・変更された問題だけを確認")
+    parser.add_argument('--max-existing-id', type=int, default=487,
+                        help="--baseline を指定しない場合に既存問題とみなす最大のID番号")
+    parser.add_argument('--save-snapshot', action='store_true',
+                        help="現在の内容をスナップショットとして保存（次回 --baseline snapshot で使用）")
+    parser.add_argument('--profile', type=Path,
+                        help="段階ごとの時間と比較した組み合わせの数をJSONで保存")
+    parser.add_argument('--cprofile', type=Path,
+                        help="cProfile の結果を保存（pstats / snakeviz で確認できる）")
+    args = parser.parse_args()
+    
+    engine = 'exhaustive' if args.exhaustive else args.engine
+    if engine == 'batch' and not HAS_NUMPY:
+        print("NumPy が見つからないため --engine index で実行します")
+        engine = 'index'
+    
+    profiler = StageProfiler()
+    profile = cProfile.Profile() if args.cprofile else None
+    if profile:
+        profile.enable()
+    check_duplicates_comprehensive(engine=engine,
+                                   workers=args.workers,
+                                   chunk_size=args.chunk_size,
+                                   cache_path=None if args.no_cache else args.cache,
+                                   pair_cache_path=None if args.no_cache else args.pair_cache,
+                                   terms=args.terms,
+                                   scope=args.scope,
+                                   baseline=args.baseline,
+                                   max_existing_id=args.max_existing_id,
+                                   snapshot=args.save_snapshot,
+                                   profiler=profiler)
+    if profile:
+        profile.disable()
+        profile.dump_stats(args.cprofile)
+        print(f"\ncProfile の結果を {args.cprofile} に保存しました")
+    if args.profile:
+        profiler.write(args.profile)
+        print(f"\n計測結果を {args.profile} に保存しました")
+
 if __name__ == "__main__":
-    check_duplicates_comprehensive()
\ No newline at end of file
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重複問題のグループ化スクリプト
+questions.json の問題どうしで類似度が閾値を超える組み合わせをつなぎ（Union-Find）、
+同じ問題の言い換えをまとめたグループごとに1回だけ表示する。
+正解の選択肢が異なる組み合わせは、同じ型の別の問題とみなしてつながない。
+各グループには残す問題（代表）を提案し、それ以外を削除する bulk_edit の操作ファイルを
+出力する（--apply ではグループごとに確認してから適用する）
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from bulk_edit import apply_operations
+from check_duplicates import SCOPE_LABELS, detect_duplicates
+from question_io import QUESTIONS_JSON_PATH, iter_questions, write_bytes_atomic, write_questions
+from text_normalize import normalize_text
+
+
+class UnionFind:
+    """要素 0..size-1 の素集合（経路圧縮とサイズによる併合）"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item: int) -> int:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, item1: int, item2: int):
+        root1, root2 = self.find(item1), self.find(item2)
+        if root1 == root2:
+            return
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+
+
+def canonical_member(questions: List[Dict], members: List[int]) -> int:
+    """グループで残す問題を提案（解説のある問題を優先し、その中で最も前にある問題）"""
+    return min(members, key=lambda pos: (not questions[pos].get('explanation', '').strip(), pos))
+
+
+def correct_option(q: Dict) -> Optional[str]:
+    """正解の選択肢を正規化したテキスト（取り出せなければ None）"""
+    options = q.get('options')
+    answer = q.get('correctAnswer')
+    if not isinstance(options, list) or not isinstance(answer, int) or not 0 <= answer < len(options):
+        return None
+    return normalize_text(str(options[answer]))
+
+
+def same_answer_edges(questions: List[Dict],
+                      edges: List[Tuple[int, int, float, str]]) -> List[Tuple[int, int, float, str]]:
+    """正解の選択肢のテキストが一致する組み合わせだけを返す
+
+    「京都で使われる言葉で、「○○」とは」のような同じ型の問題は問題文が似ていても
+    答えが異なる別の問題なので、グループにまとめない
+    """
+    return [edge for edge in edges
+            if correct_option(questions[edge[0]]) == correct_option(questions[edge[1]])]
+
+
+def build_clusters(questions: List[Dict], edges: List[Tuple[int, int, float, str]]) -> List[Dict]:
+    """閾値を超えた組み合わせから、2問以上のグループを最初の問題の位置順に返す
+
+    edges は same_answer_edges で正解の異なる組み合わせを除いたものを渡す
+    """
+    union_find = UnionFind(len(questions))
+    for pos1, pos2, _, _ in edges:
+        union_find.union(pos1, pos2)
+
+    groups: Dict[int, List[int]] = {union_find.find(pos1): [] for pos1, _, _, _ in edges}
+    for pos in range(len(questions)):
+        root = union_find.find(pos)
+        if root in groups:
+            groups[root].append(pos)
+
+    group_edges: Dict[int, List[Tuple[int, int, float, str]]] = {}
+    for edge in edges:
+        group_edges.setdefault(union_find.find(edge[0]), []).append(edge)
+
+    clusters = []
+    for root, members in groups.items():
+        clusters.append({
+            'members': members,
+            'canonical': canonical_member(questions, members),
+            'edges': group_edges[root],
+        })
+    clusters.sort(key=lambda cluster: cluster['members'][0])
+    return clusters
+
+
+def removal_operations(questions: List[Dict], clusters: List[Dict],
+                       renumber: str = 'shift') -> Tuple[Dict, List[str]]:
+    """代表以外を削除する bulk_edit の操作と、IDの重複のため削除できなかった問題の注記を返す
+
+    bulk_edit はIDで削除するため、同じIDの問題が複数ある場合は削除対象にしない
+    """
+    id_counts: Dict[str, int] = {}
+    for q in questions:
+        id_counts[q['id']] = id_counts.get(q['id'], 0) + 1
+
+    delete = []
+    skipped = []
+    for cluster in clusters:
+        for pos in cluster['members']:
+            if pos == cluster['canonical']:
+                continue
+            question_id = questions[pos]['id']
+            if id_counts[question_id] > 1:
+                skipped.append(f"{question_id}: 同じIDの問題が{id_counts[question_id]}件あるため削除対象にしません")
+            else:
+                delete.append(question_id)
+    return {'delete': delete, 'renumber': renumber}, skipped
+
+
+def print_cluster(questions: List[Dict], cluster: Dict, number: int):
+    """グループの問題・正解・類似度を表示"""
+    similarities = [edge[2] for edge in cluster['edges']]
+    print(f"\n🔗 グループ {number}: {len(cluster['members'])}問 "
+          f"（類似度 {min(similarities):.2f}〜{max(similarities):.2f}）")
+    for pos in cluster['members']:
+        q = questions[pos]
+        mark = "★" if pos == cluster['canonical'] else "  "
+        print(f"  {mark} {q['id']} ({q['level']}, {q['category']}) {q['question'][:50]}")
+        print(f"       正解: {q['options'][q['correctAnswer']]}")
+
+
+def print_clusters(questions: List[Dict], clusters: List[Dict]):
+    """グループごとに問題と類似度を表示"""
+    for number, cluster in enumerate(clusters, 1):
+        print_cluster(questions, cluster, number)
+
+
+def confirm_clusters(questions: List[Dict], clusters: List[Dict]) -> List[Dict]:
+    """グループを1件ずつ表示して確認し、代表以外の削除を承認したグループを返す"""
+    approved = []
+    for number, cluster in enumerate(clusters, 1):
+        print_cluster(questions, cluster, number)
+        answer = input(f"このグループの★以外の{len(cluster['members']) - 1}問を削除しますか？ "
+                       f"(y/n/q): ").strip().lower()
+        if answer == 'q':
+            break
+        if answer == 'y':
+            approved.append(cluster)
+    return approved
+
+
+def cluster_report(questions: List[Dict], clusters: List[Dict]) -> List[Dict]:
+    """グループをJSONで保存するための形式に変換"""
+    return [{
+        'canonical': questions[cluster['canonical']]['id'],
+        'members': [questions[pos]['id'] for pos in cluster['members']],
+        'edges': [{
+            'question1': questions[pos1]['id'],
+            'question2': questions[pos2]['id'],
+            'similarity': round(similarity, 4),
+            'reason': reason,
+        } for pos1, pos2, similarity, reason in cluster['edges']],
+    } for cluster in clusters]
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="類似度が閾値を超える問題をグループにまとめ、代表以外を削除")
+    parser.add_argument('--target', type=Path, default=QUESTIONS_JSON_PATH, help="対象のファイル")
+    parser.add_argument('--threshold', type=float, default=0.7, help="同じグループとみなす類似度（既定: 0.7）")
+    parser.add_argument('--scope', choices=list(SCOPE_LABELS), default='bucket',
+                        help="比較する範囲（bucket: 級とカテゴリが同じ問題, level: 級が同じ問題, all: すべて）")
+    parser.add_argument('--engine', choices=['index', 'batch', 'exhaustive'], default='index',
+                        help="候補の絞り込み方法")
+    parser.add_argument('--workers', type=int, default=1, help="並列実行するプロセス数")
+    parser.add_argument('--output', type=Path, help="グループの保存先（JSON）")
+    parser.add_argument('--operations-out', type=Path, help="代表以外を削除する bulk_edit の操作ファイルの保存先")
+    parser.add_argument('--renumber', choices=['shift', 'sequential', 'none'], default='shift',
+                        help="削除後のIDの振り直し方（bulk_edit の renumber）")
+    parser.add_argument('--apply', action='store_true',
+                        help="グループごとに確認し、承認したグループの代表以外を削除して対象のファイルを更新")
+    args = parser.parse_args()
+
+    questions = list(iter_questions(args.target))
+    print(f"問題数: {len(questions)}")
+    _, edges = detect_duplicates([], questions, engine=args.engine, workers=args.workers,
+                                 scope=args.scope, pair_threshold=args.threshold)
+    kept_edges = same_answer_edges(questions, edges)
+    clusters = build_clusters(questions, kept_edges)
+    grouped = sum(len(cluster['members']) for cluster in clusters)
+    print(f"類似度 {args.threshold} を超える組み合わせ: {len(edges)}件"
+          f"（正解が異なるためつながない組み合わせ: {len(edges) - len(kept_edges)}件）")
+    print(f"重複グループ: {len(clusters)}件（{grouped}問、★は残す問題の候補）")
+    print_clusters(questions, clusters)
+
+    operations, skipped = removal_operations(questions, clusters, args.renumber)
+    print(f"\n削除候補: {len(operations['delete'])}問")
+    for note in skipped:
+        print(f"  ⚠️ {note}")
+
+    if args.output:
+        content = json.dumps(cluster_report(questions, clusters), ensure_ascii=False, indent=2)
+        write_bytes_atomic(args.output, content.encode('utf-8'))
+        print(f"\nグループを {args.output} に保存しました")
+    if args.operations_out:
+        content = json.dumps(operations, ensure_ascii=False, indent=2)
+        write_bytes_atomic(args.operations_out, content.encode('utf-8'))
+        print(f"操作ファイルを {args.operations_out} に保存しました（bulk_edit.py で適用できます）")
+
+    if not args.apply or not operations['delete']:
+        return
+    print("\n=== 削除の確認（y: 削除する, n: 残す, q: 以降のグループをすべて残す） ===")
+    operations, _ = removal_operations(questions, confirm_clusters(questions, clusters), args.renumber)
+    if not operations['delete']:
+        print("\n削除する問題がないため中止しました")
+        sys.exit(1)
+    answer = input(f"\n{args.target.name}から{len(operations['delete'])}問を削除しますか？ (y/n): ").strip().lower()
+    if answer != 'y':
+        print("中止しました")
+        sys.exit(1)
+    result, remap = apply_operations(questions, operations)
+    write_questions(result, args.target)
+    changed = sum(1 for new_id in remap.values() if new_id is not None)
+    print(f"\n✅ {args.target.name}を更新しました（{len(questions)}問 → {len(result)}問、ID変更 {changed}件）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重複検出の精度評価スクリプト
+generate: questions.json の問題から言い換え・選択肢の並べ替え・全角半角の変更・
+          括弧の変更を加えた重複問題を作り、正解（元の問題）とともに保存する
+evaluate: 保存したデータで重複チェックを実行し、閾値 0.4 / 0.7 での
+          適合率・再現率を実行時間とともに表示する
+
+新規問題には重複問題のほか、既存問題から外した実際の問題（重複ではない問題）を含める
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from check_duplicates import detect_duplicates
+from question_io import QUESTIONS_JSON_PATH, iter_questions, write_bytes_atomic
+
+THRESHOLDS = (0.4, 0.7)
+DATASET_VERSION = 1
+
+# 言い換え（意味を変えない語尾・表現の置き換え）
+PARAPHRASES = [
+    ('はどこか。', 'はどこでしょうか。'),
+    ('はどれか。', 'はどれでしょうか。'),
+    ('はどれか', 'はどれでしょうか'),
+    ('として知られる', 'として有名な'),
+    ('で知られる', 'で有名な'),
+    ('と呼ばれる', 'と称される'),
+    ('最も適当なもの', '最もふさわしいもの'),
+    ('正しいもの', '適切なもの'),
+    ('誤っているもの', '間違っているもの'),
+    ('に指定されている', 'に指定された'),
+    ('行われる', '催される'),
+]
+HALF_TO_FULL = str.maketrans({chr(code): chr(code + 0xFEE0) for code in range(0x21, 0x7F)})
+FULL_TO_HALF = str.maketrans({chr(code + 0xFEE0): chr(code) for code in range(0x21, 0x7F)})
+BRACKETS = str.maketrans({'(': '（', ')': '）', '（': '(', '）': ')', '「': '『', '」': '』'})
+
+
+def paraphrase(q: Dict, rng: random.Random) -> Dict:
+    """語尾や表現を言い換える（該当する表現がなければ前置きを付ける）"""
+    text = q['question']
+    for before, after in PARAPHRASES:
+        if before in text:
+            text = text.replace(before, after)
+    if text == q['question']:
+        text = '次のうち、' + text
+    return {**q, 'question': text}
+
+
+def reorder_options(q: Dict, rng: random.Random) -> Dict:
+    """選択肢を並べ替え、正解の位置を合わせる"""
+    order = list(range(len(q['options'])))
+    while len(order) > 1 and order == sorted(order):
+        rng.shuffle(order)
+    return {
+        **q,
+        'options': [q['options'][i] for i in order],
+        'correctAnswer': order.index(q['correctAnswer']),
+    }
+
+
+def change_width(q: Dict, rng: random.Random) -> Dict:
+    """英数字・記号の全角と半角を入れ替える"""
+    def convert(text: str) -> str:
+        table = FULL_TO_HALF if any('！' <= char <= '～' for char in text) else HALF_TO_FULL
+        return text.translate(table)
+    return {**q, 'question': convert(q['question']), 'options': [convert(opt) for opt in q['options']]}
+
+
+def change_brackets(q: Dict, rng: random.Random) -> Dict:
+    """括弧の種類を変える（例: (　) と （　）、「」と『』）"""
+    return {
+        **q,
+        'question': q['question'].translate(BRACKETS),
+        'options': [opt.translate(BRACKETS) for opt in q['options']],
+    }
+
+
+def combined(q: Dict, rng: random.Random) -> Dict:
+    """すべての変更を重ねる"""
+    for transform in (paraphrase, reorder_options, change_width, change_brackets):
+        q = transform(q, rng)
+    return q
+
+
+TRANSFORMS: Dict[str, Callable[[Dict, random.Random], Dict]] = {
+    'paraphrase': paraphrase,
+    'reorder_options': reorder_options,
+    'width': change_width,
+    'brackets': change_brackets,
+    'combined': combined,
+}
+
+
+def generate_dataset(questions: List[Dict], duplicates: int, negatives: int, seed: int = 0) -> Dict:
+    """既存問題・新規問題（重複問題と重複でない問題）・正解をまとめたデータを作成"""
+    rng = random.Random(seed)
+    positions = list(range(len(questions)))
+    rng.shuffle(positions)
+    held_out = set(positions[:negatives])
+    existing = [q for pos, q in enumerate(questions) if pos not in held_out]
+
+    new = []
+    ground_truth = {}
+    names = list(TRANSFORMS)
+    for number, source_pos in enumerate(rng.sample(range(len(existing)), duplicates), 1):
+        name = names[(number - 1) % len(names)]
+        injected = TRANSFORMS[name](dict(existing[source_pos]), rng)
+        injected['id'] = f"dup{number:04d}"
+        new.append(injected)
+        ground_truth[injected['id']] = {'source': source_pos, 'source-id': existing[source_pos]['id'],
+                                        'transform': name}
+    for number, pos in enumerate(sorted(held_out), 1):
+        new.append({**questions[pos], 'id': f"neg{number:04d}"})
+    rng.shuffle(new)
+    return {'version': DATASET_VERSION, 'existing': existing, 'new': new, 'ground_truth': ground_truth}
+
+
+def evaluate(dataset: Dict, engine: str = 'index', workers: int = 1) -> Dict:
+    """重複チェックを実行し、閾値ごと・変更の種類ごとの適合率と再現率を返す
+
+    新規問題の最良一致が正解の元の問題（または元の問題と同じ内容の既存問題）であれば
+    正しい検出とする
+    """
+    existing, new, ground_truth = dataset['existing'], dataset['new'], dataset['ground_truth']
+    content_keys = [(q['question'], tuple(sorted(q['options']))) for q in existing]
+    start = time.perf_counter()
+    best_matches, _ = detect_duplicates(existing, new, engine=engine, workers=workers)
+    seconds = time.perf_counter() - start
+
+    report = {'engine': engine, 'seconds': round(seconds, 3), 'thresholds': {}}
+    for threshold in THRESHOLDS:
+        predicted = correct = 0
+        found_by_transform: Dict[str, int] = {}
+        for new_pos, (existing_pos, similarity, _) in best_matches.items():
+            if similarity <= threshold:
+                continue
+            predicted += 1
+            truth = ground_truth.get(new[new_pos]['id'])
+            if truth and content_keys[truth['source']] == content_keys[existing_pos]:
+                correct += 1
+                found_by_transform[truth['transform']] = found_by_transform.get(truth['transform'], 0) + 1
+        totals: Dict[str, int] = {}
+        for truth in ground_truth.values():
+            totals[truth['transform']] = totals.get(truth['transform'], 0) + 1
+        report['thresholds'][str(threshold)] = {
+            'predicted': predicted,
+            'correct': correct,
+            'precision': round(correct / predicted, 4) if predicted else None,
+            'recall': round(correct / len(ground_truth), 4) if ground_truth else None,
+            'recall_by_transform': {name: round(found_by_transform.get(name, 0) / total, 4)
+                                    for name, total in sorted(totals.items())},
+        }
+    return report
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="重複問題を埋め込んだデータで重複検出の精度と速度を評価")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    generate_parser = subparsers.add_parser('generate', help="評価用データを作成")
+    generate_parser.add_argument('output', type=Path, help="評価用データの保存先（JSON）")
+    generate_parser.add_argument('--input', type=Path, default=QUESTIONS_JSON_PATH, help="元にする問題ファイル")
+    generate_parser.add_argument('--duplicates', type=int, default=500, help="埋め込む重複問題の数")
+    generate_parser.add_argument('--negatives', type=int, default=500, help="重複でない新規問題の数")
+    generate_parser.add_argument('--seed', type=int, default=0, help="乱数の種")
+    evaluate_parser = subparsers.add_parser('evaluate', help="評価用データで精度と速度を計測")
+    evaluate_parser.add_argument('dataset', type=Path, help="generate で作成したデータ")
+    evaluate_parser.add_argument('--engines', nargs='+', choices=['index', 'batch', 'exhaustive'],
+                                 default=['index'], help="評価する候補の絞り込み方法")
+    evaluate_parser.add_argument('--workers', type=int, default=1, help="並列実行するプロセス数")
+    evaluate_parser.add_argument('--output', type=Path, help="評価結果の保存先（JSON）")
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        questions = list(iter_questions(args.input, exclude=['explanation']))
+        dataset = generate_dataset(questions, args.duplicates, args.negatives, args.seed)
+        content = json.dumps(dataset, ensure_ascii=False, indent=2).encode('utf-8')
+        write_bytes_atomic(args.output, content)
+        print(f"既存問題: {len(dataset['existing'])}問")
+        print(f"新規問題: {len(dataset['new'])}問（うち重複問題 {len(dataset['ground_truth'])}問）")
+        print(f"✅ 評価用データを {args.output} に保存しました")
+        return
+
+    with open(args.dataset, 'r', encoding='utf-8') as f:
+        dataset = json.load(f)
+    reports = []
+    for engine in args.engines:
+        report = evaluate(dataset, engine=engine, workers=args.workers)
+        reports.append(report)
+        print(f"\n=== {engine}（{report['seconds']:.2f} 秒） ===")
+        for threshold, result in report['thresholds'].items():
+            precision = f"{result['precision']:.3f}" if result['precision'] is not None else "-"
+            recall = f"{result['recall']:.3f}" if result['recall'] is not None else "-"
+            print(f"  閾値 {threshold}: 適合率 {precision} / 再現率 {recall}"
+                  f"（検出 {result['predicted']}件, 正解 {result['correct']}件）")
+            for name, value in result['recall_by_transform'].items():
+                print(f"    {name:<16} 再現率 {value:.3f}")
+    if args.output:
+        content = json.dumps(reports, ensure_ascii=False, indent=2).encode('utf-8')
+        write_bytes_atomic(args.output, content)
+        print(f"\n評価結果を {args.output} に保存しました")
+
+
+if __name__ == "__main__":
+    main()
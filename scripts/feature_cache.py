@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+問題ごとの特徴量キャッシュと、問題の組み合わせごとの類似度キャッシュ
+問題文と選択肢のハッシュをキーに、正規化済み問題文・キーワード・選択肢や
+2問の類似度と理由をディスクに保存して次回以降の実行で再利用する
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from gazetteer import TermAutomaton
+from question_io import write_bytes_atomic
+
+# 特徴量の算出方法（text_normalize.normalize_text / extract_key_terms）や保存形式を変えたら更新する
+FEATURE_VERSION = 4
+# 類似度の算出方法（calculate_feature_similarity）を変えたら更新する
+SCORE_VERSION = 1
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / ".cache" / "question_features.json"
+DEFAULT_PAIR_CACHE_PATH = Path(__file__).parent.parent / ".cache" / "pair_scores.json"
+
+
+def content_hash(q: Dict) -> str:
+    """問題文と選択肢から内容ハッシュを作成"""
+    payload = json.dumps([q['question'], q['options']], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def features_hash(text: str, terms: Iterable[str], options: Iterable[str]) -> str:
+    """特徴量（正規化問題文・キーワード・選択肢）のハッシュを作成"""
+    payload = json.dumps([text, sorted(terms), sorted(options)], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class RunStampedCache:
+    """最後に使われた実行回でエントリを管理するディスクキャッシュ
+
+    エントリは variant（キーワード抽出方法など算出条件の識別子）ごとに同じファイルへ保存し、
+    ほかの variant のエントリは読み書きしても残す。max_entries は variant ごとの上限で、
+    超えた分は古いものから削除する。version が異なるファイルは破棄する。
+    """
+
+    version = FEATURE_VERSION
+
+    def __init__(self, path: Optional[Path], max_entries: int, variant: str):
+        self.path = Path(path) if path else None
+        self.variant = variant
+        self.max_entries = max_entries
+        self.entries: Dict[str, Dict] = {}
+        self.run = 1
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self.load()
+
+    def _read(self) -> Dict:
+        """キャッシュファイルの内容（存在しない・壊れている・version が異なる場合は空）"""
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != self.version:
+            return {}
+        return data
+
+    def load(self):
+        """キャッシュファイルから今回の variant のエントリを読み込む"""
+        data = self._read()
+        section = data.get('variants', {}).get(self.variant)
+        self.run = data.get('run', 0) + 1
+        if section is not None:
+            self.entries = section.get('entries', {})
+            self.restore(section)
+
+    def restore(self, section: Dict):
+        """読み込んだ variant の付加情報に合わせてエントリを更新する（派生クラスで定義）"""
+
+    def section_info(self) -> Dict:
+        """エントリとともに保存する variant の付加情報（派生クラスで定義）"""
+        return {}
+
+    def touch(self, entry: Dict):
+        """エントリを今回の実行で使ったものとして記録"""
+        if entry['run'] != self.run:
+            entry['run'] = self.run
+            self._dirty = True
+
+    def evict(self):
+        """上限を超えたエントリを最終利用が古い順に削除"""
+        overflow = len(self.entries) - self.max_entries
+        if overflow <= 0:
+            return
+        oldest = sorted(self.entries, key=lambda k: self.entries[k]['run'])[:overflow]
+        for key in oldest:
+            del self.entries[key]
+        self._dirty = True
+
+    def save(self):
+        """キャッシュファイルを書き出す（一時ファイル経由で置き換え）
+
+        ほかの variant のエントリは書き出す直前のファイルから引き継ぐため、
+        別の variant で同時に実行していても互いのエントリを消さない
+        """
+        if not self.path or not self._dirty:
+            return
+        self.evict()
+        data = self._read()
+        variants = data.get('variants', {})
+        variants[self.variant] = {**self.section_info(), 'entries': self.entries}
+        content = json.dumps({'version': self.version, 'run': max(self.run, data.get('run', 0)),
+                              'variants': variants}, ensure_ascii=False)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_bytes_atomic(self.path, content.encode('utf-8'))
+        self._dirty = False
+
+
+class FeatureCache(RunStampedCache):
+    """内容ハッシュをキーにした特徴量キャッシュ
+
+    get() の結果には特徴量のハッシュ（'hash'）を含める。類似度キャッシュのキーに使う
+
+    固有名詞辞書でキーワードを抽出する場合は terms に辞書の語を渡す。辞書は選択肢から作るため
+    問題の追加・編集で変わるが、キーワードは「問題文に現れる辞書語」なので、前回の辞書との差分
+    （追加・削除された語）だけでキャッシュ済みのキーワードを更新し、エントリは捨てない
+    """
+
+    def __init__(self, compute: Callable[[Dict], Dict],
+                 path: Optional[Path] = DEFAULT_CACHE_PATH,
+                 max_entries: int = 20000, variant: str = 'regex',
+                 terms: Optional[Iterable[str]] = None):
+        self.compute = compute
+        self.terms = sorted(set(terms)) if terms is not None else None
+        super().__init__(path, max_entries, variant)
+
+    def restore(self, section: Dict):
+        """前回の辞書との差分でキーワードを更新（前回の辞書がわからなければエントリを捨てる）"""
+        if self.terms is None:
+            return
+        previous = section.get('terms')
+        if previous is None:
+            self.entries = {}
+            return
+        added = set(self.terms) - set(previous)
+        removed = set(previous) - set(self.terms)
+        if not added and not removed:
+            return
+        automaton = TermAutomaton(added) if added else None
+        for entry in self.entries.values():
+            terms = set(entry['terms']) - removed
+            if automaton:
+                terms |= automaton.find(entry['text'])
+            entry['terms'] = sorted(terms)
+            entry['hash'] = features_hash(entry['text'], entry['terms'], entry['options'])
+        self._dirty = True
+
+    def section_info(self) -> Dict:
+        return {'terms': self.terms} if self.terms is not None else {}
+
+    def get(self, q: Dict) -> Dict:
+        """問題の特徴量を返す（キャッシュになければ算出して登録）"""
+        key = content_hash(q)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.touch(entry)
+            return {
+                'text': entry['text'],
+                'terms': set(entry['terms']),
+                'options': set(entry['options']),
+                'hash': entry['hash'],
+            }
+
+        self.misses += 1
+        features = self.compute(q)
+        features['hash'] = features_hash(features['text'], features['terms'], features['options'])
+        self.entries[key] = {
+            'text': features['text'],
+            'terms': sorted(features['terms']),
+            'options': sorted(features['options']),
+            'hash': features['hash'],
+            'run': self.run,
+        }
+        self._dirty = True
+        return features
+
+
+class PairScoreCache(RunStampedCache):
+    """2問の特徴量のハッシュ（FeatureCache.get() の 'hash'）の組をキーにした類似度キャッシュ
+
+    類似度は特徴量だけで決まるため、キーワードの抽出方法や固有名詞辞書が変わっても
+    特徴量が変わらなかった組み合わせのエントリはそのまま使える。
+    キーは (1問目, 2問目) の順のハッシュ。ratio() まで計算した組み合わせは類似度と理由を、
+    上限の見積もりで打ち切った組み合わせは理由を None として類似度の上限を保存する。
+    プロセスプールのワーカーには table() で必要な部分だけを渡し、
+    ワーカーで使った値は record() で登録する。
+    """
+
+    version = FEATURE_VERSION * 1000 + SCORE_VERSION
+
+    def __init__(self, path: Optional[Path] = DEFAULT_PAIR_CACHE_PATH, max_entries: int = 20000):
+        super().__init__(path, max_entries, 'features')
+        self._by_first: Optional[Dict[str, List[str]]] = None
+
+    @staticmethod
+    def key(hash1: str, hash2: str) -> str:
+        return f"{hash1}:{hash2}"
+
+    def table(self, first_hashes: Iterable[str]) -> Dict[str, Dict[str, Tuple[float, Optional[str]]]]:
+        """1問目のハッシュが first_hashes に含まれるエントリを {1問目: {2問目: (類似度, 理由)}} で返す"""
+        if self._by_first is None:
+            self._by_first = {}
+            for key in self.entries:
+                self._by_first.setdefault(key.split(':')[0], []).append(key)
+        table: Dict[str, Dict[str, Tuple[float, Optional[str]]]] = {}
+        for hash1 in set(first_hashes):
+            for key in self._by_first.get(hash1, []):
+                entry = self.entries[key]
+                table.setdefault(hash1, {})[key.split(':')[1]] = (entry['score'], entry['reason'])
+        return table
+
+    def record(self, scores: List[Tuple[str, str, float, Optional[str]]], hits: int = 0):
+        """ワーカーで使った (1問目, 2問目, 類似度, 理由) を登録し、ヒット数を加算
+
+        上限しかないエントリは、計算した類似度やより小さい上限で置き換える
+        """
+        self.hits += hits
+        for hash1, hash2, score, reason in scores:
+            key = self.key(hash1, hash2)
+            entry = self.entries.get(key)
+            if entry is not None and not (entry['reason'] is None and
+                                          (reason is not None or score < entry['score'])):
+                self.touch(entry)
+            else:
+                self.misses += 1
+                self.entries[key] = {'score': score, 'reason': reason, 'run': self.run}
+                self._dirty = True
+                self._by_first = None
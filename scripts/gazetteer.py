@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+固有名詞辞書（ガゼッティア）によるキーワード抽出
+questions.json の選択肢から寺社・人物・祭・工芸などの固有名詞を集め、
+Aho-Corasick オートマトンで問題文を1回走査してキーワードを抽出する
+"""
+
+import hashlib
+import re
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Set
+
+# 漢字の後ろに付いた読み仮名（例: 後水尾天皇ごみずのおてんのう）
+READING_SUFFIX = re.compile(r'(?<=[一-龯々])[ぁ-ゖ]{2,}$')
+# 複数の語をつないだ選択肢の区切り（例: やすらい祭―玄武神社。正規化で全角は半角になる）
+ENTRY_SEPARATOR = re.compile(r'[-－―—/／→,，]')
+# 辞書に入れる語は漢字かカタカナを含み、数字を含まないもの
+ENTRY_PATTERN = re.compile(r'^(?=.*[一-龯々ァ-ヶ])[^0-9０-９]{2,}$')
+
+
+class TermAutomaton:
+    """Aho-Corasick 法による複数語の同時マッチング"""
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = sorted(set(terms))
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[str]] = [[]]
+        for term in self.terms:
+            self._add(term)
+        self._build_failure_links()
+        self.digest = hashlib.sha1('\n'.join(self.terms).encode('utf-8')).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _add(self, term: str):
+        state = 0
+        for char in term:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append(term)
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find(self, text: str) -> Set[str]:
+        """テキスト中に現れる辞書語の集合を返す（文字数に比例する1回の走査）"""
+        found = set()
+        state = 0
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+def option_entries(option: str) -> Set[str]:
+    """正規化済みの選択肢1つから辞書語の候補を取り出す"""
+    entries = set()
+    for part in ENTRY_SEPARATOR.split(option):
+        for entry in (part, READING_SUFFIX.sub('', part)):
+            if ENTRY_PATTERN.match(entry):
+                entries.add(entry)
+    return entries
+
+
+def build_gazetteer(questions: List[Dict], normalize: Callable[[str], str],
+                    max_df_ratio: float = 0.03) -> TermAutomaton:
+    """選択肢から固有名詞辞書を作成
+
+    問題文の max_df_ratio を超える割合に現れる語（「京都」など）は
+    区別に役立たないため除外する
+    """
+    entries = set()
+    for q in questions:
+        for option in q['options']:
+            entries.update(option_entries(normalize(option)))
+
+    automaton = TermAutomaton(entries)
+    document_frequency: Dict[str, int] = {}
+    for q in questions:
+        for term in automaton.find(normalize(q['question'])):
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+
+    max_df = max(1, int(len(questions) * max_df_ratio))
+    frequent = {term for term, df in document_frequency.items() if df > max_df}
+    if not frequent:
+        return automaton
+    return TermAutomaton(entries - frequent)
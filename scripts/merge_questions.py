@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追加問題一括マージスクリプト
+複数のステージングファイル（additional_*.json など）を検証し、
+新しいIDを採番して questions.json に1回の読み込み・書き込みでまとめて追加する
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from question_bank import QuestionBank, validate_question
+from question_io import QUESTIONS_JSON_PATH, append_questions, iter_questions
+from text_normalize import normalize_text
+
+
+def load_staging_files(paths: List[Path]) -> List[Tuple[Path, int, Dict]]:
+    """ステージングファイルの問題を (ファイル, 番号, 問題) のリストで返す"""
+    staged = []
+    for path in paths:
+        for number, q in enumerate(iter_questions(path), 1):
+            staged.append((path, number, q))
+    return staged
+
+
+def validate_staged(bank: QuestionBank, staged: List[Tuple[Path, int, Dict]]) -> List[str]:
+    """各問題の不備と、既存問題・他の追加問題との問題文の一致（表記ゆれを除く）を検出"""
+    errors = []
+    known_texts = {normalize_text(q['question']): q['id'] for q in bank}
+    for path, number, q in staged:
+        label = f"{path.name} #{number}"
+        errors.extend(f"{label}: {error}" for error in validate_question(q))
+        text = normalize_text(q['question']) if isinstance(q.get('question'), str) else ''
+        if not text:
+            continue
+        if text in known_texts:
+            errors.append(f"{label}: 問題文が {known_texts[text]} と一致しています（全角・半角や括弧・句読点の違いを除く）")
+        else:
+            known_texts[text] = label
+    return errors
+
+
+def merge_questions(paths: List[Path], target: Path = QUESTIONS_JSON_PATH,
+                    dry_run: bool = False, assume_yes: bool = False) -> int:
+    """ステージングファイルをマージし、終了コードを返す"""
+    bank = QuestionBank.load(target)
+    print(f"既存問題数: {len(bank)}")
+
+    staged = load_staging_files(paths)
+    for path in paths:
+        print(f"  {path}: {sum(1 for p, _, _ in staged if p == path)}問")
+
+    errors = validate_staged(bank, staged)
+    if errors:
+        print(f"\n❌ 検証エラー: {len(errors)}件")
+        for error in errors:
+            print(f"  {error}")
+        return 1
+
+    # IDを採番（ステージングファイルのIDは使わない）
+    new_questions = []
+    for path, number, q in staged:
+        record = {'id': None, **{k: v for k, v in q.items() if k != 'id'}}
+        record.setdefault('explanation', '')
+        original_id = q.get('id', '-')
+        bank.add(record)
+        new_questions.append(record)
+        print(f"  {path.name} #{number} ({original_id}) → {record['id']}")
+
+    print(f"\n追加する問題数: {len(new_questions)}")
+    level_year_stats = {}
+    for q in new_questions:
+        key = (q['level'], q['exam-year'])
+        level_year_stats[key] = level_year_stats.get(key, 0) + 1
+    for (level, year), count in sorted(level_year_stats.items()):
+        print(f"  {level} {year}: {count}問")
+
+    if dry_run:
+        print("\n--dry-run のため questions.json は更新しません")
+        return 0
+    if not new_questions:
+        return 0
+    if not assume_yes:
+        answer = input(f"\n{target.name}に{len(new_questions)}問を追加しますか？ (y/n): ").strip().lower()
+        if answer != 'y':
+            print("中止しました")
+            return 1
+
+    append_questions(new_questions, target)
+    print(f"\n{target.name}を更新しました")
+    print(f"総問題数: {len(bank)}問 (新規追加: {len(new_questions)}問)")
+    return 0
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="ステージングファイルの問題を questions.json に一括マージ")
+    parser.add_argument('files', type=Path, nargs='+', help="追加する問題のファイル（{\"questions\": [...]} 形式）")
+    parser.add_argument('--target', type=Path, default=QUESTIONS_JSON_PATH, help="マージ先のファイル")
+    parser.add_argument('--dry-run', action='store_true', help="検証と採番結果の表示のみ行う")
+    parser.add_argument('-y', '--yes', action='store_true', help="確認せずにマージする")
+    args = parser.parse_args()
+
+    sys.exit(merge_questions(args.files, args.target, dry_run=args.dry_run, assume_yes=args.yes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配信用データのパッケージングスクリプト
+questions.json を最小化し、内容ハッシュ付きのファイル名で gzip / brotli の
+圧縮済みファイルとともに書き出す。現在のファイル名はマニフェストに記録する
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, Set
+
+from question_io import QUESTIONS_JSON_PATH, dumps_questions, iter_questions, write_bytes_atomic
+
+try:
+    import brotli
+except ImportError:  # brotli がない環境では gzip のみ出力する
+    brotli = None
+
+DEFAULT_OUTPUT_DIR = QUESTIONS_JSON_PATH.parent / "packed"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+HASH_LENGTH = 12
+HASHED_FILE_PATTERN = re.compile(rf'^questions\.[0-9a-f]{{{HASH_LENGTH}}}\.json(\.gz|\.br)?$')
+
+
+def hashed_file_name(stem: str, content: bytes) -> str:
+    """内容ハッシュ入りのファイル名（例: questions.1a2b3c4d5e6f.json）"""
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}.json"
+
+
+def compressed_variants(content: bytes) -> Dict[str, bytes]:
+    """拡張子ごとの圧縮済みデータ（gzip は mtime を固定して毎回同じ内容にする）"""
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return variants
+
+
+def previous_manifest_files(output_dir: Path) -> Set[str]:
+    """前回のマニフェストに載っているファイル名（マニフェストがない・壊れている場合は空）"""
+    manifest_path = output_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        return set()
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f).get('questions', {})
+    except ValueError:
+        return set()
+    files = {entry['file']} if 'file' in entry else set()
+    files.update(variant['file'] for variant in entry.get('encodings', {}).values())
+    return files
+
+
+def remove_stale_files(output_dir: Path, keep: Set[str], source: Path):
+    """前回のマニフェストに載っているか、ハッシュ付きのファイル名で、今回出力しなかったファイルを削除
+
+    それ以外のファイルと読み込んだ元のファイル（source）は削除しない
+    """
+    candidates = previous_manifest_files(output_dir)
+    candidates.update(path.name for path in output_dir.iterdir() if HASHED_FILE_PATTERN.match(path.name))
+    for name in sorted(candidates - keep):
+        path = output_dir / name
+        if path.is_file() and path.resolve() != source.resolve():
+            path.unlink()
+            print(f"  削除: {name}")
+
+
+def package_questions(source: Path = QUESTIONS_JSON_PATH,
+                      output_dir: Path = DEFAULT_OUTPUT_DIR) -> Dict:
+    """最小化・圧縮したファイルとマニフェストを書き出し、マニフェストを返す"""
+    questions = list(iter_questions(source))
+    content = dumps_questions(questions, compact=True).encode('utf-8')
+    file_name = hashed_file_name('questions', content)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    write_bytes_atomic(output_dir / file_name, content)
+    entry = {
+        'file': file_name,
+        'count': len(questions),
+        'sha256': hashlib.sha256(content).hexdigest(),
+        'bytes': len(content),
+        'encodings': {},
+    }
+    written = {file_name}
+    for suffix, compressed in compressed_variants(content).items():
+        write_bytes_atomic(output_dir / (file_name + suffix), compressed)
+        entry['encodings']['gzip' if suffix == '.gz' else 'br'] = {
+            'file': file_name + suffix,
+            'bytes': len(compressed),
+        }
+        written.add(file_name + suffix)
+
+    remove_stale_files(output_dir, written, source)
+    manifest = {'version': MANIFEST_VERSION, 'questions': entry}
+    manifest_content = json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+    write_bytes_atomic(output_dir / MANIFEST_NAME, manifest_content)
+    return manifest
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="questions.json を配信用に最小化・圧縮して書き出す")
+    parser.add_argument('--input', type=Path, default=QUESTIONS_JSON_PATH, help="読み込むファイル")
+    parser.add_argument('--output-dir', type=Path, default=DEFAULT_OUTPUT_DIR, help="出力先ディレクトリ")
+    args = parser.parse_args()
+
+    original_bytes = args.input.stat().st_size
+    entry = package_questions(args.input, args.output_dir)['questions']
+
+    print(f"=== パッケージング完了: {args.output_dir} ===")
+    print(f"  元ファイル: {original_bytes:,} バイト")
+    print(f"  {entry['file']}: {entry['bytes']:,} バイト（{entry['count']}問）")
+    for encoding, variant in entry['encodings'].items():
+        print(f"  {variant['file']}: {variant['bytes']:,} バイト（{encoding}）")
+    if brotli is None:
+        print("  ※ brotli モジュールがないため .br は出力していません")
+
+
+if __name__ == "__main__":
+    main()
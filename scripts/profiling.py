@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+処理段階ごとの計測
+段階ごとの経過時間とカウンタを集計し、JSONのレポートとして書き出す
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+from question_io import write_bytes_atomic
+
+
+class StageProfiler:
+    """段階ごとの経過時間（秒）とカウンタを集計する
+
+    プロセスプールのワーカーで集計した値は merge でまとめる
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """with ブロックの経過時間を name の段階に加算"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, stats: Dict[str, Dict]):
+        """ワーカーの集計結果 {'timings': {...}, 'counters': {...}} を加算"""
+        for name, seconds in stats.get('timings', {}).items():
+            self.add_time(name, seconds)
+        for name, value in stats.get('counters', {}).items():
+            self.count(name, value)
+
+    def report(self) -> Dict:
+        """レポート（ワーカーの時間は合計のため、並列実行では全体時間を超えることがある）"""
+        return {
+            'total_seconds': round(time.perf_counter() - self._started, 4),
+            'timings': {name: round(seconds, 4) for name, seconds in self.timings.items()},
+            'counters': dict(self.counters),
+        }
+
+    def write(self, path: Path):
+        """レポートをJSONで保存"""
+        content = json.dumps(self.report(), ensure_ascii=False, indent=2).encode('utf-8')
+        write_bytes_atomic(path, content)
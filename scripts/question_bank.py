@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+問題バンク
+questions.json を1回だけ読み込み、ID採番・索引・統計をまとめて管理する
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Container, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from question_io import QUESTIONS_JSON_PATH, iter_questions
+
+QUESTION_ID_PATTERN = re.compile(r'^q(\d+)$')
+# 内容から一度だけ採番し、削除後も振り直さない安定ID（例: k1a2b3c4d5e）
+STABLE_ID_PATTERN = re.compile(r'^k[0-9a-f]{10,}$')
+STABLE_ID_LENGTH = 10
+VALID_LEVELS = ('1級', '2級', '3級')
+REQUIRED_FIELDS = ('level', 'category', 'exam-year', 'question', 'options', 'correctAnswer')
+
+
+def parse_question_id(question_id: str) -> Optional[int]:
+    """'q123' 形式のIDから番号を取り出す（形式外なら None）"""
+    match = QUESTION_ID_PATTERN.match(question_id)
+    return int(match.group(1)) if match else None
+
+
+def format_question_id(number: int) -> str:
+    """番号から 'q001' 形式のIDを作成"""
+    return f"q{number:03d}"
+
+
+def is_stable_id(question_id: str) -> bool:
+    """安定ID形式かどうか"""
+    return STABLE_ID_PATTERN.match(question_id) is not None
+
+
+def stable_question_id(q: Dict, taken: Container[str] = ()) -> str:
+    """級・問題文・選択肢から安定IDを作成（taken と衝突する場合は別の値にずらす）"""
+    payload = json.dumps([q['level'], q['question'], q['options']], ensure_ascii=False)
+    salt = 0
+    while True:
+        salted = payload if salt == 0 else f"{payload}#{salt}"
+        question_id = 'k' + hashlib.sha1(salted.encode('utf-8')).hexdigest()[:STABLE_ID_LENGTH]
+        if question_id not in taken:
+            return question_id
+        salt += 1
+
+
+def validate_question(q: Dict) -> List[str]:
+    """問題データの不備を列挙（アプリの Question エンティティと同じ制約）"""
+    errors = [f"{field} がありません" for field in REQUIRED_FIELDS if field not in q]
+    if errors:
+        return errors
+    if q['level'] not in VALID_LEVELS:
+        errors.append(f"level が不正です: {q['level']}")
+    for field in ('category', 'exam-year', 'question'):
+        if not isinstance(q[field], str) or not q[field].strip():
+            errors.append(f"{field} が空です")
+    options = q['options']
+    if not isinstance(options, list) or len(options) != 4:
+        errors.append("options は4つの選択肢が必要です")
+    elif any(not isinstance(opt, str) or not opt.strip() for opt in options):
+        errors.append("options に空の選択肢があります")
+    answer = q['correctAnswer']
+    if not isinstance(answer, int) or isinstance(answer, bool) or not 0 <= answer <= 3:
+        errors.append(f"correctAnswer は0〜3の整数が必要です: {answer}")
+    if not isinstance(q.get('explanation', ''), str):
+        errors.append("explanation は文字列が必要です")
+    return errors
+
+
+class QuestionBank:
+    """問題の一覧と、ID・（級, カテゴリ, 試験日）の索引、統計を保持する
+
+    問題を追加するたびに索引と統計を更新するため、
+    ID採番や件数の取得は問題数によらず定数時間で行える。
+    安定IDの問題を含むバンクでは、追加する問題にも安定IDを付与する。
+    """
+
+    def __init__(self, questions: Optional[List[Dict]] = None):
+        self.questions: List[Dict] = []
+        self.max_id = 0
+        self.uses_stable_ids = False
+        self.by_id: Dict[str, Dict] = {}
+        self.by_group: Dict[Tuple[str, str, str], List[str]] = {}
+        self.duplicate_ids: Set[str] = set()
+        self.level_year_counts: Dict[Tuple[str, str], int] = {}
+        self.category_counts: Dict[Tuple[str, str], int] = {}
+        for q in questions or []:
+            self._register(q)
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = QUESTIONS_JSON_PATH) -> 'QuestionBank':
+        """questions.json から読み込む（ファイルがなければ空のバンク）"""
+        if not Path(path).exists():
+            return cls()
+        return cls(iter_questions(path))
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.questions)
+
+    def _register(self, q: Dict):
+        self.questions.append(q)
+
+        question_id = q['id']
+        number = parse_question_id(question_id)
+        if number is not None:
+            self.max_id = max(self.max_id, number)
+        elif is_stable_id(question_id):
+            self.uses_stable_ids = True
+        if question_id in self.by_id:
+            self.duplicate_ids.add(question_id)
+        else:
+            self.by_id[question_id] = q
+
+        group = (q['level'], q['category'], q['exam-year'])
+        self.by_group.setdefault(group, []).append(question_id)
+
+        level_year = (q['level'], q['exam-year'])
+        self.level_year_counts[level_year] = self.level_year_counts.get(level_year, 0) + 1
+        level_category = (q['level'], q['category'])
+        self.category_counts[level_category] = self.category_counts.get(level_category, 0) + 1
+
+    def next_id(self) -> str:
+        """次に採番されるIDを返す（予約はしない）"""
+        return format_question_id(self.max_id + 1)
+
+    def allocate_id(self) -> str:
+        """新しいIDを採番して予約する"""
+        self.max_id += 1
+        return format_question_id(self.max_id)
+
+    def add(self, q: Dict) -> Dict:
+        """問題に新しいIDを付与して追加する"""
+        if self.uses_stable_ids:
+            q['id'] = stable_question_id(q, self.by_id)
+        else:
+            q['id'] = self.allocate_id()
+        self._register(q)
+        return q
+
+    def get(self, question_id: str) -> Optional[Dict]:
+        """IDから問題を取得（IDが重複している場合は最初の問題）"""
+        return self.by_id.get(question_id)
+
+    def count(self, level: str, exam_year: str) -> int:
+        """級と試験日ごとの問題数"""
+        return self.level_year_counts.get((level, exam_year), 0)
+
+    def group_ids(self, level: str, category: str, exam_year: str) -> List[str]:
+        """（級, カテゴリ, 試験日）に属する問題のID"""
+        return self.by_group.get((level, category, exam_year), [])
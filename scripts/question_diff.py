@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+問題データの差分
+基準（questions.backup.json などのファイル、git のリビジョン、保存したスナップショット）と
+現在の questions.json を内容ハッシュで1回ずつ走査して比べ、追加・変更された問題を求める
+"""
+
+import argparse
+import hashlib
+import json
+import subprocess
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from question_io import QUESTIONS_JSON_PATH, iter_questions, write_bytes_atomic
+
+REPO_ROOT = Path(__file__).parent.parent
+DEFAULT_SNAPSHOT_PATH = REPO_ROOT / ".cache" / "question_snapshot.json"
+SNAPSHOT_VERSION = 1
+GIT_PREFIX = 'git:'
+
+
+def record_hash(q: Dict) -> str:
+    """重複チェックに関わる項目（級・カテゴリ・問題文・選択肢）の内容ハッシュ"""
+    payload = json.dumps([q['level'], q['category'], q['question'], q['options']], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def load_baseline(source: str) -> List[Tuple[str, str]]:
+    """基準の (ID, 内容ハッシュ) のリストを読み込む
+
+    source は 'git:<リビジョン>'（questions.json のそのリビジョンの内容）、
+    'snapshot'（既定のスナップショット）、または問題ファイルかスナップショットのパス
+    """
+    if source.startswith(GIT_PREFIX):
+        path = QUESTIONS_JSON_PATH.resolve().relative_to(REPO_ROOT.resolve()).as_posix()
+        content = subprocess.run(['git', 'show', f"{source[len(GIT_PREFIX):]}:{path}"],
+                                 cwd=REPO_ROOT, check=True, capture_output=True).stdout
+        return [(q['id'], record_hash(q)) for q in json.loads(content.decode('utf-8'))['questions']]
+
+    path = DEFAULT_SNAPSHOT_PATH if source == 'snapshot' else Path(source)
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(64)
+    if '"hashes"' in head or '"version"' in head:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"スナップショットの形式が異なります: {path}")
+        return [tuple(entry) for entry in snapshot['hashes']]
+    return [(q['id'], record_hash(q)) for q in iter_questions(path, exclude=['explanation'])]
+
+
+def save_snapshot(questions: List[Dict], path: Path = DEFAULT_SNAPSHOT_PATH):
+    """現在の問題の (ID, 内容ハッシュ) をスナップショットとして保存"""
+    snapshot = {'version': SNAPSHOT_VERSION, 'hashes': [[q['id'], record_hash(q)] for q in questions]}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_bytes_atomic(path, json.dumps(snapshot, ensure_ascii=False).encode('utf-8'))
+
+
+def diff_questions(questions: List[Dict], baseline: List[Tuple[str, str]]) -> Dict[str, List]:
+    """基準と比べて追加・変更・変更なしの問題の位置と、削除された基準のIDを返す（O(n)）
+
+    同じ内容の問題が複数ある場合は件数で対応させ、基準より多い分を追加とみなす。
+    基準にないハッシュの問題は、基準に同じIDがあれば変更、なければ追加とする
+    """
+    remaining = Counter(content for _, content in baseline)
+    baseline_ids = {question_id for question_id, _ in baseline}
+    result: Dict[str, List] = {'added': [], 'changed': [], 'unchanged': [], 'removed': []}
+    for pos, q in enumerate(questions):
+        content = record_hash(q)
+        if remaining[content] > 0:
+            remaining[content] -= 1
+            result['unchanged'].append(pos)
+        elif q['id'] in baseline_ids:
+            result['changed'].append(pos)
+        else:
+            result['added'].append(pos)
+    changed_ids = {questions[pos]['id'] for pos in result['changed']}
+    for question_id, content in baseline:
+        if remaining[content] > 0:
+            remaining[content] -= 1
+            if question_id not in changed_ids:  # 変更された問題の変更前は削除に含めない
+                result['removed'].append(question_id)
+    return result
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="基準と比べて追加・変更・削除された問題を表示")
+    parser.add_argument('baseline', help="基準（ファイルのパス、git:<リビジョン>、snapshot）")
+    parser.add_argument('--target', type=Path, default=QUESTIONS_JSON_PATH, help="比べるファイル")
+    parser.add_argument('--save-snapshot', action='store_true',
+                        help=f"現在の内容をスナップショット（{DEFAULT_SNAPSHOT_PATH.name}）として保存")
+    args = parser.parse_args()
+
+    questions = list(iter_questions(args.target, exclude=['explanation']))
+    diff = diff_questions(questions, load_baseline(args.baseline))
+    print(f"問題数: {len(questions)}")
+    print(f"  追加: {len(diff['added'])}問 / 変更: {len(diff['changed'])}問 / "
+          f"変更なし: {len(diff['unchanged'])}問 / 削除: {len(diff['removed'])}問")
+    for label, key in (('追加', 'added'), ('変更', 'changed')):
+        for pos in diff[key]:
+            q = questions[pos]
+            print(f"  {label} {q['id']} ({q['level']}, {q['category']}) {q['question'][:40]}")
+    if args.save_snapshot:
+        save_snapshot(questions)
+        print(f"\nスナップショットを {DEFAULT_SNAPSHOT_PATH} に保存しました")
+
+
+if __name__ == "__main__":
+    main()
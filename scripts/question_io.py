@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+問題データの入出力
+{"questions": [...]} 形式のJSONを1問ずつ読み込むストリーミングローダーと、
+一時ファイル経由で置き換える書き込み処理
+"""
+
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Union
+
+QUESTIONS_JSON_PATH = Path(__file__).parent.parent / "public" / "data" / "questions.json"
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+# 整形済み形式でトップレベルの questions の配列が始まる行と、字下げ4未満の行
+_QUESTIONS_MEMBER = b'\n  "questions": ['
+_SHALLOW_LINE = re.compile(rb'\n(?!    )')
+
+
+class _StreamReader:
+    """ファイルを少しずつ読みながら JSON の値を1つずつ取り出す"""
+
+    def __init__(self, f: IO[str], chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """バッファに追記（読み終えた部分は捨てる）。追記できなければ False"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """空白を読み飛ばして次の1文字を返す（終端では空文字）"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars: str) -> str:
+        """次の1文字が chars のいずれかであることを確認して読み進める"""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"JSONの形式が不正です: {chars!r} が必要な位置に {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """次の JSON 値を1つ読み込む"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # 数値などはチャンクの境目で途切れている可能性がある
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _project(record: Dict, fields: Optional[set], exclude: Optional[set]) -> Dict:
+    if fields is not None:
+        record = {k: v for k, v in record.items() if k in fields}
+    if exclude:
+        record = {k: v for k, v in record.items() if k not in exclude}
+    return record
+
+
+def iter_questions(source: Union[str, Path] = QUESTIONS_JSON_PATH,
+                   fields: Optional[Iterable[str]] = None,
+                   exclude: Optional[Iterable[str]] = None,
+                   chunk_size: int = 65536) -> Iterator[Dict]:
+    """{"questions": [...]} 形式のファイルから問題を1問ずつ返す
+
+    ファイル全体を読み込まないため、問題数によらずメモリ使用量は一定。
+    fields を指定するとそのキーだけを、exclude を指定するとそのキーを除いて返す
+    （例: exclude=['explanation']）。
+    """
+    fields = set(fields) if fields is not None else None
+    exclude = set(exclude) if exclude else None
+
+    with open(source, 'r', encoding='utf-8') as f:
+        reader = _StreamReader(f, chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key != 'questions':
+                reader.value()  # questions 以外の値は読み飛ばす
+            else:
+                reader.expect('[')
+                if reader.peek() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield _project(reader.value(), fields, exclude)
+                        if reader.expect(',]') == ']':
+                            break
+            if reader.expect(',}') == '}':
+                return
+
+
+def dumps_questions(questions: List[Dict], compact: bool = False) -> str:
+    """{"questions": [...]} 形式の文字列を作成
+
+    通常はスクリプトが従来書き出していた json.dump(..., indent=2) と同じ形式、
+    compact=True では空白を除いた最小化形式（デプロイ用）
+    """
+    data = {"questions": questions}
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def _default_file_mode() -> int:
+    """新しく作るファイルの既定の権限（open() で作った場合と同じく 0o666 から umask を除く）"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _atomic_writer(path: Path):
+    """書き込み先と同じディレクトリに一時ファイルを作成"""
+    return tempfile.NamedTemporaryFile('wb', dir=path.parent, prefix=f".{path.name}.",
+                                       suffix='.tmp', delete=False)
+
+
+def _atomic_write(path: Path, write: Callable[[IO[bytes]], None]):
+    """一時ファイルに書き切ってから rename で元のファイルと置き換える
+
+    途中で中断しても元のファイルは壊れず、一時ファイルは削除される。
+    一時ファイルは所有者だけが読める権限で作られるため、元のファイルの権限
+    （新しく作る場合は umask に従った既定の権限）に合わせてから置き換える
+    """
+    tmp_file = _atomic_writer(path)
+    try:
+        write(tmp_file)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+        tmp_file.close()
+        if path.exists():
+            shutil.copymode(path, tmp_file.name)
+        else:
+            os.chmod(tmp_file.name, _default_file_mode())
+        os.replace(tmp_file.name, path)
+    except BaseException:
+        tmp_file.close()
+        os.unlink(tmp_file.name)
+        raise
+
+
+def write_bytes_atomic(path: Union[str, Path], content: bytes):
+    """バイト列を一時ファイル経由で書き出す"""
+    _atomic_write(Path(path), lambda f: f.write(content))
+
+
+def write_questions(questions: List[Dict], path: Union[str, Path] = QUESTIONS_JSON_PATH,
+                    compact: bool = False):
+    """問題一覧を一時ファイル経由で書き出す"""
+    write_bytes_atomic(path, dumps_questions(questions, compact).encode('utf-8'))
+
+
+def _encode_record(q: Dict, compact: bool) -> str:
+    """配列の要素1つを、全体を dumps_questions した場合と同じ形式で文字列にする"""
+    if compact:
+        return json.dumps(q, ensure_ascii=False, separators=(',', ':'))
+    lines = json.dumps(q, ensure_ascii=False, indent=2).split('\n')
+    return '\n'.join('    ' + line for line in lines)
+
+
+def _tail_closes_questions(path: Path) -> bool:
+    """末尾の ] と } が、トップレベルの最後のメンバーである questions の配列を閉じているか
+
+    dumps_questions の整形済み形式（indent=2）では文字列に改行が入らないため、行頭の字下げが
+    そのまま JSON の深さを表す。最後の字下げ2の行（トップレベルのメンバー）が "questions": [ で、
+    そこから末尾の ] の行までがすべてより深く字下げされていれば、末尾の ] はその配列を閉じている。
+    問題を読み込まずバイト列の検索だけで確かめる。最小化形式などこの形でないファイルは False
+    """
+    size = path.stat().st_size
+    if size == 0:
+        return False
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        tail = data[max(0, size - 256):].rstrip()
+        if not tail.endswith(b'\n}'):
+            return False
+        end = size - len(data[max(0, size - 256):]) + len(tail) - 2  # 最後の } の前の改行
+        start = data.rfind(b'\n  "', 0, end)
+        if start < 0 or data[start:start + len(_QUESTIONS_MEMBER)] != _QUESTIONS_MEMBER:
+            return False
+        opened = start + len(_QUESTIONS_MEMBER)
+        if data[opened:end] == b']':
+            return True  # 空の配列
+        return (data[opened:opened + 1] == b'\n' and data[end - 4:end] == b'\n  ]'
+                and _SHALLOW_LINE.search(data, opened, end - 4) is None)
+
+
+def _copy_bytes(src: IO[bytes], dst: IO[bytes], length: int, chunk_size: int = 1 << 20):
+    """src の先頭から length バイトを dst にコピー"""
+    while length > 0:
+        chunk = src.read(min(chunk_size, length))
+        if not chunk:
+            break
+        dst.write(chunk)
+        length -= len(chunk)
+
+
+def append_questions(new_questions: List[Dict], path: Union[str, Path] = QUESTIONS_JSON_PATH):
+    """既存の問題を再エンコードせず、配列の閉じ括弧の直前に新しい問題を追記する
+
+    既存部分はバイト列のままコピーするため、全件を書き直すより速い。
+    結果は dumps_questions で全件を書き出した場合と同じ形式になる。
+    末尾が questions の配列を閉じていると確かめられない場合（例: {"questions": [...], "meta": ...}、
+    最小化形式）は、ファイル全体を読み込んで questions に追加し、ほかのメンバーとともに書き直す
+    （整形済みか最小化かは既存ファイルに合わせる）。
+    questions の配列がなければ ValueError。
+    """
+    path = Path(path)
+    if not new_questions:
+        return
+    if not path.exists():
+        write_questions(new_questions, path)
+        return
+
+    if not _tail_closes_questions(path):
+        _rewrite_with_questions(path, new_questions)
+        return
+
+    size = path.stat().st_size
+    with open(path, 'rb') as f:
+        f.seek(max(0, size - 256))
+        tail = f.read()
+
+    # 末尾は「最後の要素, 改行と字下げ, ], 改行, }, 空白」（_tail_closes_questions で確認済み）
+    closing_bracket = tail.rstrip()[:-1].rstrip()
+    last_value = closing_bracket[:-1].rstrip()
+    is_empty = last_value.endswith(b'[')
+    splice_at = size - len(tail) + len(last_value)
+    bracket_at = size - len(tail) + len(closing_bracket) - 1
+
+    records = ',\n'.join(_encode_record(q, compact=False) for q in new_questions)
+    insert = ('\n' if is_empty else ',\n') + records + '\n  '
+
+    def write(dst: IO[bytes]):
+        with open(path, 'rb') as src:
+            _copy_bytes(src, dst, splice_at)
+            dst.write(insert.encode('utf-8'))
+            src.seek(bracket_at)
+            dst.write(src.read())
+
+    _atomic_write(path, write)
+
+
+def _rewrite_with_questions(path: Path, new_questions: List[Dict]):
+    """ファイル全体を読み込み、questions に問題を追加して書き直す（ほかのメンバーは残す）"""
+    with open(path, 'rb') as f:
+        compact = f.read(2) != b'{\n'
+        f.seek(0)
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get('questions'), list):
+        raise ValueError(f"{path} は {{\"questions\": [...]}} の形式ではありません")
+    data['questions'].extend(new_questions)
+    if compact:
+        content = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    else:
+        content = json.dumps(data, ensure_ascii=False, indent=2)
+    write_bytes_atomic(path, content.encode('utf-8'))
+
+
+def main():
+    """questions.json の最小化コピーを作成（デプロイ用）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="questions.json を最小化して書き出す")
+    parser.add_argument('output', type=Path, help="書き出し先")
+    parser.add_argument('--input', type=Path, default=QUESTIONS_JSON_PATH, help="読み込むファイル")
+    args = parser.parse_args()
+
+    questions = list(iter_questions(args.input))
+    write_questions(questions, args.output, compact=True)
+    print(f"{args.output} に {len(questions)}問を書き出しました"
+          f"（{args.input.stat().st_size:,} → {args.output.stat().st_size:,} バイト）")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,31 +3,36 @@
 """
 重複問題削除スクリプト
 q488（桓武天皇・平安京問題）を削除し、IDを再採番
+（安定IDへの移行後は、対応表で q488 の安定IDに読み替える）
 """
 
-import json
-from pathlib import Path
+import sys
+
+from bulk_edit import apply_operations, resolve_operations
+from question_io import QUESTIONS_JSON_PATH, iter_questions, write_questions
+from stable_ids import load_aliases
 
 def remove_duplicate_question():
     """重複問題q488を削除"""
     
     # questions.jsonを読み込み
-    json_path = Path(__file__).parent.parent / "public" / "data" / "questions.json"
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    questions = data['questions']
+    questions = list(iter_questions(QUESTIONS_JSON_PATH))
     
     print(f"削除前の問題数: {len(questions)}")
     
-    # q488を削除
-    questions_filtered = [q for q in questions if q['id'] != 'q488']
+    # q488を削除し、q488以降のIDを1つ繰り上げ
+    operations = resolve_operations({"delete": ["q488"], "renumber": "shift"}, load_aliases())
+    removed_question = [q for q in questions if q['id'] == operations['delete'][0]]
+    print(f"\nIDの再採番中...")
+    try:
+        questions_filtered, remap = apply_operations(questions, operations)
+    except ValueError as e:
+        print(f"❌ 操作の検証に失敗しました:\n{e}")
+        sys.exit(1)
     
     print(f"削除後の問題数: {len(questions_filtered)}")
     
     # 削除された問題の情報を表示
-    removed_question = [q for q in questions if q['id'] == 'q488']
     if removed_question:
         q = removed_question[0]
         print(f"\n削除された問題:")
@@ -35,28 +40,12 @@ def remove_duplicate_question():
         print(f"  問題: {q['question']}")
         print(f"  理由: 既存のq001と重複")
     
-    # IDを再採番（q488以降のIDを1つ繰り上げ）
-    print(f"\nIDの再採番中...")
-    
-    for i, question in enumerate(questions_filtered):
-        original_id = question['id']
-        
-        if question['id'].startswith('q'):
-            id_num = int(question['id'][1:])
-            
-            # q488以降のIDを1つ繰り上げ
-            if id_num > 488:
-                new_id_num = id_num - 1
-                question['id'] = f"q{new_id_num:03d}"
-                
-                if original_id != question['id']:
-                    print(f"  {original_id} → {question['id']}")
-    
-    # 更新されたデータを保存
-    updated_data = {"questions": questions_filtered}
+    for original_id, new_id in remap.items():
+        if new_id is not None:
+            print(f"  {original_id} → {new_id}")
     
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(updated_data, f, ensure_ascii=False, indent=2)
+    # 更新されたデータを保存（一時ファイル経由で置き換え）
+    write_questions(questions_filtered, QUESTIONS_JSON_PATH)
     
     print(f"\n✅ 重複問題削除完了")
     print(f"最終問題数: {len(questions_filtered)}問")
@@ -11,6 +11,12 @@ const data = JSON.parse(fs.readFileSync(questionsPath, 'utf-8'));
 const questions = data.questions;
 console.log(`Total questions: ${questions.length}`);
 
+// 安定ID（scripts/stable_ids.py で移行済み）は振り直さない
+if (questions.some((q) => !/^q\d+$/.test(q.id))) {
+  console.log('Stable IDs detected; renumbering skipped (see scripts/stable_ids.py)');
+  process.exit(0);
+}
+
 // IDを連番に振り直し
 questions.forEach((q, index) => {
   const oldId = q.id;
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+類似問題の検索
+questions.json の問題から（級, カテゴリ）ごとの候補絞り込みインデックスを一度だけ作り、
+作成中の問題に最も似ている既存問題を k 件、類似度と理由とともに返す。
+問題を追加するスクリプトから、IDを付与する前に1問ずつ確認するために使う
+"""
+
+import argparse
+import heapq
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from candidate_index import CandidateIndex
+from check_duplicates import SCOPE_LABELS, bucket_key, question_features, score_features
+from feature_cache import DEFAULT_CACHE_PATH, FeatureCache
+from question_io import QUESTIONS_JSON_PATH, iter_questions
+
+
+class SimilarityIndex:
+    """問題の一覧に対する類似問題検索用のインデックス
+
+    scope は check_duplicates.bucket_key と同じ（'bucket', 'level', 'all'）。
+    feature_cache を省略すると既定の特徴量キャッシュを使う。
+    add() で問題を追加すると以降の検索の対象に含まれ、remove() で外すと含まれなくなる
+    （位置は詰めない）
+    """
+
+    def __init__(self, questions: List[Dict], scope: str = 'bucket',
+                 feature_cache: Optional[FeatureCache] = None):
+        self.scope = scope
+        self.feature_cache = feature_cache or FeatureCache(question_features, DEFAULT_CACHE_PATH)
+        self.questions: List[Dict] = []
+        self.features: List[Dict] = []
+        # バケット → (インデックス, インデックスの文書番号に対応する位置)
+        self.buckets: Dict[Tuple[str, ...], Tuple[CandidateIndex, List[int]]] = {}
+        # 位置 → (バケット, 文書番号)（外した問題は None）
+        self.locations: List[Optional[Tuple[Tuple[str, ...], int]]] = []
+        for q in questions:
+            self.add(q)
+        self.feature_cache.save()
+
+    @classmethod
+    def load(cls, path: Path = QUESTIONS_JSON_PATH, scope: str = 'bucket',
+             cache_path: Optional[Path] = DEFAULT_CACHE_PATH) -> 'SimilarityIndex':
+        """問題ファイルを読み込んでインデックスを作成（特徴量は cache_path のキャッシュを使う）"""
+        questions = list(iter_questions(path, exclude=['explanation']))
+        return cls(questions, scope, FeatureCache(question_features, cache_path))
+
+    def __len__(self) -> int:
+        return sum(1 for location in self.locations if location is not None)
+
+    def add(self, q: Dict) -> int:
+        """問題を検索対象に追加し、位置を返す"""
+        pos = len(self.questions)
+        features = self.feature_cache.get(q)
+        self.questions.append(q)
+        self.features.append(features)
+        key = bucket_key(q, self.scope)
+        index, positions = self.buckets.setdefault(key, (CandidateIndex(), []))
+        self.locations.append((key, index.add(features)))
+        positions.append(pos)
+        return pos
+
+    def remove(self, pos: int):
+        """位置 pos の問題を検索対象から外す"""
+        key, doc_id = self.locations[pos]
+        self.buckets[key][0].remove(doc_id)
+        self.locations[pos] = None
+
+    def _target_buckets(self, q: Dict) -> List[Tuple[CandidateIndex, List[int]]]:
+        """問題と比較するバケット（級・カテゴリがない問題は、ある項目だけで絞り込む）"""
+        if all(field in q for field in ('level', 'category')):
+            bucket = self.buckets.get(bucket_key(q, self.scope))
+            return [bucket] if bucket else []
+        wanted = [q.get('level'), q.get('category')]
+        return [bucket for key, bucket in self.buckets.items()
+                if all(value is None or value == part for value, part in zip(wanted, key))]
+
+    def find_similar(self, q: Dict, k: int = 5, min_score: float = 0.0,
+                     exclude: Optional[int] = None) -> List[Tuple[int, float, str]]:
+        """q に最も似ている問題を k 件、(位置, 類似度, 理由) の類似度の高い順で返す
+
+        類似度が min_score 以下の問題と、位置が exclude の問題は含めない。
+        k 件目の類似度を超えない組み合わせは上限の見積もりで打ち切るため、
+        結果は全件を比較した場合の上位 k 件と一致する（候補絞り込みで除かれる問題を除く）
+        """
+        features = question_features(q)
+        top: List[Tuple[float, int, str]] = []  # (類似度, -位置, 理由) の最小ヒープ
+        for index, positions in self._target_buckets(q):
+            for doc_id in index.candidates(features):
+                pos = positions[doc_id]
+                if pos == exclude:
+                    continue
+                floor = top[0][0] if len(top) >= k else min_score
+                scored = score_features(features, self.features[pos], floor)
+                if scored is None or scored[0] <= floor:
+                    continue
+                entry = (scored[0], -pos, scored[1])
+                if len(top) < k:
+                    heapq.heappush(top, entry)
+                else:
+                    heapq.heapreplace(top, entry)
+        return [(-neg_pos, similarity, reason)
+                for similarity, neg_pos, reason in sorted(top, reverse=True)]
+
+
+_default_index: Optional[SimilarityIndex] = None
+
+
+def find_similar(question: Dict, k: int = 5, min_score: float = 0.0,
+                 index: Optional[SimilarityIndex] = None) -> List[Dict]:
+    """questions.json から question に最も似ている問題を k 件返す
+
+    index を省略すると questions.json のインデックスを初回に作成して使い回す。
+    戻り値は 'question'（既存問題）, 'similarity', 'reason' を持つ辞書のリスト
+    """
+    global _default_index
+    if index is None:
+        if _default_index is None:
+            _default_index = SimilarityIndex.load()
+        index = _default_index
+    return [{'question': index.questions[pos], 'similarity': similarity, 'reason': reason}
+            for pos, similarity, reason in index.find_similar(question, k, min_score)]
+
+
+def warn_similar(index: SimilarityIndex, q: Dict, k: int = 3, threshold: float = 0.4) -> int:
+    """追加前の問題について、類似度が threshold を超える問題を表示し、その件数を返す"""
+    hits = index.find_similar(q, k, threshold)
+    for pos, similarity, reason in hits:
+        existing = index.questions[pos]
+        mark = "⚠️ 重複疑い" if similarity > 0.7 else "⚡ 類似注意"
+        print(f"   {mark}: {similarity:.2f} - {existing.get('id', '(ID未付与)')} "
+              f"{existing['question'][:40]}...")
+        print(f"      理由: {reason}")
+    return len(hits)
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="作成中の問題に似ている既存問題を検索")
+    parser.add_argument('question', nargs='?', help="問題文")
+    parser.add_argument('--options', nargs='+', default=[], help="選択肢")
+    parser.add_argument('--level', help="級（指定するとその級の問題だけを検索）")
+    parser.add_argument('--category', help="カテゴリ（指定するとそのカテゴリの問題だけを検索）")
+    parser.add_argument('--id', dest='question_id', help="既存問題のIDを指定して、その問題に似ている問題を検索")
+    parser.add_argument('--file', type=Path, help="問題ファイル（JSON）の各問題について検索")
+    parser.add_argument('-k', type=int, default=5, help="表示する件数（既定: 5）")
+    parser.add_argument('--min-score', type=float, default=0.0, help="表示する最低の類似度")
+    parser.add_argument('--scope', choices=list(SCOPE_LABELS), default='bucket',
+                        help="比較する範囲（bucket: 級とカテゴリが同じ問題, level: 級が同じ問題, all: すべて）")
+    parser.add_argument('--target', type=Path, default=QUESTIONS_JSON_PATH, help="検索対象の問題ファイル")
+    parser.add_argument('--json', action='store_true', help="結果をJSONで出力")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = SimilarityIndex.load(args.target, args.scope)
+    build_seconds = time.perf_counter() - start
+
+    queries: List[Tuple[Dict, Optional[int]]] = []
+    if args.file:
+        queries = [(q, None) for q in iter_questions(args.file, exclude=['explanation'])]
+    elif args.question_id:
+        positions = [pos for pos, q in enumerate(index.questions) if q['id'] == args.question_id]
+        if not positions:
+            parser.error(f"IDが見つかりません: {args.question_id}")
+        queries = [(index.questions[pos], pos) for pos in positions]
+    elif args.question:
+        q = {'question': args.question, 'options': args.options}
+        for field, value in (('level', args.level), ('category', args.category)):
+            if value:
+                q[field] = value
+        queries = [(q, None)]
+    else:
+        parser.error("問題文、--id、--file のいずれかを指定してください")
+
+    report = []
+    query_seconds = 0.0
+    for q, exclude in queries:
+        start = time.perf_counter()
+        hits = index.find_similar(q, args.k, args.min_score, exclude)
+        query_seconds += time.perf_counter() - start
+        report.append({'query': q, 'hits': hits})
+
+    if args.json:
+        print(json.dumps([{
+            'question': entry['query']['question'],
+            'similar': [{
+                'id': index.questions[pos]['id'],
+                'similarity': round(similarity, 4),
+                'reason': reason,
+            } for pos, similarity, reason in entry['hits']],
+        } for entry in report], ensure_ascii=False, indent=2))
+        return
+
+    print(f"検索対象: {len(index)}問（インデックス作成 {build_seconds * 1000:.0f} ms）")
+    for entry in report:
+        q = entry['query']
+        print(f"\n📝 {q.get('id', '作成中の問題')}: {q['question'][:60]}")
+        if not entry['hits']:
+            print(f"   ✅ {SCOPE_LABELS[args.scope]}に類似問題なし")
+        for pos, similarity, reason in entry['hits']:
+            existing = index.questions[pos]
+            print(f"   {similarity:.2f} {existing['id']} ({existing['level']}, {existing['category']}) "
+                  f"{existing['question'][:40]}")
+            print(f"        理由: {reason}")
+    print(f"\n検索時間: 1問あたり {query_seconds / len(queries) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
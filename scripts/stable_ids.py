@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+安定ID移行スクリプト
+questions.json の連番ID（q001 形式）を、級・問題文・選択肢から一度だけ採番する
+安定ID（k1a2b3c4d5e 形式）に置き換え、旧ID→安定IDの対応表（id_aliases.json）を保存する。
+
+安定IDは削除後も振り直さないため、削除は削除した問題だけに影響し、
+IDをキーにした履歴・報告・キャッシュは編集をまたいで有効なままになる。
+移行後に追加する問題には QuestionBank.add が安定IDを付与する
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from question_bank import is_stable_id, parse_question_id, stable_question_id
+from question_io import QUESTIONS_JSON_PATH, iter_questions, write_bytes_atomic, write_questions
+
+ALIASES_PATH = QUESTIONS_JSON_PATH.parent / "id_aliases.json"
+ALIASES_VERSION = 1
+
+
+def load_aliases(path: Path = ALIASES_PATH) -> Dict[str, str]:
+    """旧ID→安定IDの対応表を読み込む（ファイルがなければ空）"""
+    if not Path(path).exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('aliases', {})
+
+
+def save_aliases(aliases: Dict[str, str], path: Path = ALIASES_PATH):
+    """対応表を旧IDの番号順に保存"""
+    ordered = dict(sorted(aliases.items(), key=lambda item: (parse_question_id(item[0]) or 0, item[0])))
+    content = json.dumps({'version': ALIASES_VERSION, 'aliases': ordered}, ensure_ascii=False, indent=2)
+    write_bytes_atomic(path, content.encode('utf-8'))
+
+
+def resolve_id(question_id: str, aliases: Dict[str, str]) -> str:
+    """旧IDなら対応する安定IDを、それ以外はそのまま返す"""
+    return aliases.get(question_id, question_id)
+
+
+def migrate_to_stable_ids(questions: List[Dict],
+                          aliases: Dict[str, str]) -> Tuple[List[Dict], Dict[str, str], List[str]]:
+    """安定IDに置き換えた問題一覧と、追加分を含む対応表、重複していた旧IDを返す
+
+    IDが重複していた旧IDは、最初の問題（QuestionBank.get と同じ）の安定IDに対応させる
+    """
+    aliases = dict(aliases)
+    taken = {q['id'] for q in questions if is_stable_id(q['id'])} | set(aliases.values())
+    duplicated = []
+    result = []
+    for q in questions:
+        if is_stable_id(q['id']):
+            result.append(q)
+            continue
+        new_id = stable_question_id(q, taken)
+        taken.add(new_id)
+        if q['id'] in aliases:
+            duplicated.append(q['id'])
+        else:
+            aliases[q['id']] = new_id
+        result.append({**q, 'id': new_id})
+    return result, aliases, duplicated
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="連番IDを安定IDに移行し、旧IDとの対応表を管理")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help="questions.json のIDを安定IDに置き換える")
+    migrate_parser.add_argument('--target', type=Path, default=QUESTIONS_JSON_PATH, help="移行するファイル")
+    migrate_parser.add_argument('--aliases', type=Path, default=ALIASES_PATH, help="対応表のファイル")
+    migrate_parser.add_argument('--dry-run', action='store_true', help="結果の表示のみ行う")
+    resolve_parser = subparsers.add_parser('resolve', help="旧IDから安定IDを調べる")
+    resolve_parser.add_argument('ids', nargs='+', help="調べるID")
+    resolve_parser.add_argument('--aliases', type=Path, default=ALIASES_PATH, help="対応表のファイル")
+    args = parser.parse_args()
+
+    aliases = load_aliases(args.aliases)
+    if args.command == 'resolve':
+        for question_id in args.ids:
+            print(f"{question_id} → {resolve_id(question_id, aliases)}")
+        return
+
+    questions = list(iter_questions(args.target))
+    result, new_aliases, duplicated = migrate_to_stable_ids(questions, aliases)
+    migrated = len(new_aliases) - len(aliases) + len(duplicated)
+    print(f"問題数: {len(questions)}")
+    print(f"安定IDに置き換える問題: {migrated}問")
+    if duplicated:
+        print(f"⚠️ IDが重複していた問題が{len(duplicated)}件あります"
+              f"（旧IDは最初の問題の安定IDに対応させます）")
+    if migrated == 0:
+        print("すべての問題が安定IDです")
+        return
+    if args.dry_run:
+        print("\n--dry-run のためファイルは更新しません")
+        return
+
+    # 対応表を先に保存し、途中で失敗しても旧IDを引けるようにする
+    save_aliases(new_aliases, args.aliases)
+    write_questions(result, args.target)
+    print(f"\n✅ {args.target.name}を更新しました")
+    print(f"対応表を {args.aliases} に保存しました（{len(new_aliases)}件）")
+
+
+if __name__ == "__main__":
+    main()
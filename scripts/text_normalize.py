@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比較用のテキスト正規化
+NFKC で全角英数字・記号を半角に、半角カナを全角にそろえ、括弧・引用符・句読点・空白を
+取り除いて大文字を小文字にする（ラテン文字以外も含む）。重複チェック・類似問題検索・マージ時の一致判定で共通に使う
+
+変換表には文字ごとの NFKC の結果まで含めてあるため、ほとんどのテキストは
+str.translate の1回の走査で正規化できる（濁点の結合など、前後の文字に依存する
+NFKC が必要なテキストだけ unicodedata.normalize を使う）
+"""
+
+import unicodedata
+from typing import Iterator, List, Optional, Union
+
+# 括弧・引用符（開き・閉じ）と空白の一般カテゴリ
+REMOVED_CATEGORIES = ('Ps', 'Pe', 'Pi', 'Pf', 'Zs', 'Zl', 'Zp')
+# 文の区切りになる句読点（選択肢の区切りに使うダッシュ・スラッシュ・カンマは残す）
+REMOVED_PUNCTUATION = '。、?!・:;'
+# 変換しない文字だけの範囲（CJK統合漢字、ハングル音節、サロゲート、私用領域）
+UNCHANGED_RANGES = ((0x4E00, 0x9FFF), (0xAC00, 0xD7A3), (0xD800, 0xF8FF))
+
+
+def _fold(char: str) -> Optional[str]:
+    """NFKC 済みの1文字の変換先（削除する文字は None）"""
+    if unicodedata.category(char) in REMOVED_CATEGORIES or char.isspace() or char in REMOVED_PUNCTUATION:
+        return None
+    return char.lower()
+
+
+def _scanned_codes() -> Iterator[int]:
+    """基本多言語面のうち UNCHANGED_RANGES 以外の文字コード"""
+    start = 0
+    for skip_start, skip_end in UNCHANGED_RANGES:
+        yield from range(start, skip_start)
+        start = skip_end + 1
+    yield from range(start, 0x10000)
+
+
+def build_translate_table() -> List[Union[int, str, None]]:
+    """基本多言語面の文字ごとに、NFKC と _fold を合わせた変換先を並べた表
+
+    str.translate は表の範囲外の文字をそのまま残す。括弧・空白はすべて基本多言語面にある
+    """
+    table: List[Union[int, str, None]] = list(range(0x10000))
+    for code in _scanned_codes():
+        char = chr(code)
+        normalized = unicodedata.normalize('NFKC', char)
+        if normalized == char:
+            folded = _fold(char)
+            if folded != char:
+                table[code] = folded
+        else:
+            table[code] = ''.join(filter(None, map(_fold, normalized)))
+    return table
+
+
+NORMALIZE_TABLE = build_translate_table()
+
+
+def normalize_text(text: str) -> str:
+    """テキストを正規化（比較用）
+
+    例えば「（794）」と「(794)」、「(　)」の空欄、「Ｋｙｏｔｏ」と「kyoto」、「ÉΑ」と「éα」は同じになる。
+    結果は NFKC の後に _fold を1文字ずつ適用した場合と同じ
+    """
+    folded = text.translate(NORMALIZE_TABLE)
+    if unicodedata.is_normalized('NFKC', folded):
+        return folded
+    return unicodedata.normalize('NFKC', text).translate(NORMALIZE_TABLE)
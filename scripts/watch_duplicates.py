@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重複チェックの監視モード
+questions.json と追加ファイルを読み込んだ類似問題検索インデックスをメモリに保持し、
+ファイルの更新時刻を定期的に確認する。更新されたファイルは内容ハッシュで前回と比べ、
+追加・変更された問題だけをインデックスに反映して、新しく見つかった類似問題を表示する
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from check_duplicates import SCOPE_LABELS, boundary_flags
+from question_diff import record_hash
+from question_io import QUESTIONS_JSON_PATH, iter_questions
+from similar_questions import SimilarityIndex
+
+DEFAULT_WATCH_PATHS = [QUESTIONS_JSON_PATH, Path("additional_3kyuu_questions.json"),
+                       Path("additional_2kyuu_questions.json")]
+
+
+def read_questions(path: Path) -> Optional[List[Dict]]:
+    """問題ファイルを読み込む（存在しなければ空、保存途中などで読めなければ None）"""
+    if not path.exists():
+        return []
+    try:
+        return list(iter_questions(path, exclude=['explanation']))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def file_mtime(path: Path) -> Optional[int]:
+    """ファイルの更新時刻（ナノ秒、存在しなければ None）"""
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class DuplicateWatcher:
+    """監視するファイルごとに、問題の内容ハッシュとインデックス上の位置を保持する"""
+
+    def __init__(self, paths: List[Path], scope: str = 'bucket', k: int = 3, threshold: float = 0.4):
+        self.paths = paths
+        self.k = k
+        self.threshold = threshold
+        self.index = SimilarityIndex([], scope)
+        self.mtimes: Dict[Path, Optional[int]] = {}
+        self.unreadable: Dict[Path, Optional[int]] = {}
+        self.entries: Dict[Path, List[Tuple[str, int]]] = {path: [] for path in paths}
+        for path in paths:
+            self.refresh(path, report=False)
+
+    def refresh(self, path: Path, report: bool = True) -> Optional[Dict[str, int]]:
+        """ファイルを読み直してインデックスを更新し、追加・削除した問題数を返す
+
+        読めなかった場合はインデックスを更新せず None を返す（次にファイルが更新されたら読み直す）
+        """
+        mtime = file_mtime(path)
+        questions = read_questions(path)
+        if questions is None:
+            self.unreadable[path] = mtime
+            return None
+        self.mtimes[path] = mtime
+
+        # 前回と同じ内容の問題は位置を引き継ぎ、IDなどの表示用の値だけ置き換える
+        previous: Dict[str, List[int]] = {}
+        for content, pos in self.entries[path]:
+            previous.setdefault(content, []).append(pos)
+        entries = []
+        added = []
+        for q in questions:
+            content = record_hash(q)
+            if previous.get(content):
+                pos = previous[content].pop()
+                self.index.questions[pos] = q
+            else:
+                added.append(q)
+                pos = None
+            entries.append((content, pos))
+
+        removed = [pos for positions in previous.values() for pos in positions]
+        for pos in removed:
+            self.index.remove(pos)
+        added_positions = [self.index.add(q) for q in added]
+        fill = iter(added_positions)
+        self.entries[path] = [(content, pos if pos is not None else next(fill)) for content, pos in entries]
+
+        if report:
+            for pos in added_positions:
+                self.report_hits(path, pos)
+        return {'added': len(added), 'removed': len(removed)}
+
+    def report_hits(self, path: Path, pos: int) -> int:
+        """追加・変更された問題と類似度が閾値を超える問題を表示し、その件数を返す"""
+        q = self.index.questions[pos]
+        hits = self.index.find_similar(q, self.k, self.threshold, exclude=pos)
+        if not hits:
+            return 0
+        print(f"\n📝 {path.name}: {q.get('id', '(ID未付与)')} ({q['level']}, {q['category']}) "
+              f"{q['question'][:50]}")
+        for other_pos, similarity, reason in hits:
+            other = self.index.questions[other_pos]
+            mark = "⚠️ 重複疑い" if similarity > 0.7 else "⚡ 類似注意"
+            print(f"   {mark}: {similarity:.2f} - {other.get('id', '(ID未付与)')} {other['question'][:40]}...")
+            print(f"      理由: {reason}")
+            flags = boundary_flags(q, other)
+            if flags:
+                print(f"      注記: {' | '.join(flags)}")
+        return len(hits)
+
+    def poll(self) -> List[Path]:
+        """更新時刻が変わったファイルを読み直し、反映したファイルを返す"""
+        updated = []
+        for path in self.paths:
+            mtime = file_mtime(path)
+            if mtime == self.mtimes.get(path) or (path in self.unreadable and mtime == self.unreadable[path]):
+                continue
+            start = time.perf_counter()
+            counts = self.refresh(path)
+            if counts is None:
+                print(f"⏳ {path.name} を読み込めませんでした（保存途中の可能性があるため、次の更新で読み直します）")
+                continue
+            updated.append(path)
+            print(f"🔄 {path.name}: 追加・変更 {counts['added']}問 / 削除・変更前 {counts['removed']}問 "
+                  f"（{(time.perf_counter() - start) * 1000:.0f} ms）")
+        return updated
+
+    def watch(self, interval: float = 0.5):
+        """Ctrl+C で止めるまでファイルの更新を確認し続ける"""
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n監視を終了しました")
+        finally:
+            self.index.feature_cache.save()
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="問題ファイルの更新を監視して、追加・変更された問題の重複を表示")
+    parser.add_argument('paths', nargs='*', type=Path, default=DEFAULT_WATCH_PATHS,
+                        help="監視する問題ファイル（既定: questions.json と追加ファイル）")
+    parser.add_argument('--interval', type=float, default=0.5, help="更新を確認する間隔（秒）")
+    parser.add_argument('-k', type=int, default=3, help="1問あたりに表示する類似問題の数")
+    parser.add_argument('--threshold', type=float, default=0.4, help="表示する類似度（既定: 0.4）")
+    parser.add_argument('--scope', choices=list(SCOPE_LABELS), default='bucket',
+                        help="比較する範囲（bucket: 級とカテゴリが同じ問題, level: 級が同じ問題, all: すべて）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    watcher = DuplicateWatcher(args.paths, args.scope, args.k, args.threshold)
+    print(f"=== 重複チェック監視モード（{SCOPE_LABELS[args.scope]}で比較） ===")
+    for path in args.paths:
+        print(f"  {path}: {len(watcher.entries[path])}問")
+    print(f"インデックス作成: {(time.perf_counter() - start) * 1000:.0f} ms")
+    print(f"{args.interval} 秒ごとに更新を確認します（Ctrl+C で終了）")
+    watcher.watch(args.interval)
+
+
+if __name__ == "__main__":
+    main()